@@ -0,0 +1,294 @@
+"""Headless HTTP/JSON query API over the helper layer.
+
+A plain ASGI application, so it needs no web framework: serve it with
+`uvicorn api:app` or call it in-process through httpx.ASGITransport.
+The dataset is loaded once per process, and each season's partitions
+and derived structures the first time that season is queried.
+
+Endpoints (GET, query-string parameters; every endpoint also takes
+season = Summer (default) | Winter):
+    /medal-tally       year, country      (default Overall)
+    /trends            col = region | Event | AthleteID, or gender
+    /top-athletes      sport or country
+    /country-heatmap   country
+    /country-medals    country
+    /athlete           id                 (AthleteID)
+    /athlete-search    q, k               (type-ahead athlete IDs, default k=10)
+    /cache-stats
+    /metrics           format = prometheus (default, text) | json   (span histograms)
+    POST /medal-results year, city, season  (body: medals.csv rows; see live.py)
+
+Each season's state is an immutable mapping: a batch of live results
+builds a new one and swaps it in with a single assignment, and a request
+reads the state once and answers from that snapshot alone.
+
+Frames are returned as compact JSON in pandas' "split" orientation, or
+as an Arrow IPC stream when the Accept header asks for
+application/vnd.apache.arrow.stream.
+"""
+import asyncio
+import io
+import json
+import threading
+import types
+from urllib.parse import parse_qs
+
+import pandas as pd
+import pyarrow as pa
+
+import datastore
+import helper
+import ingest
+import instrumentation
+import live
+import name_search
+import preprocessor
+import result_cache
+
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+_dataset = {}
+_states = {}
+_live = {}
+_state_lock = threading.Lock()
+_live_lock = threading.Lock()
+
+
+class BadRequest(Exception):
+    pass
+
+
+def load_state(season='Summer'):
+    with _state_lock:
+        if not _dataset:
+            df, region_df = datastore.load_dataset()
+            _dataset.update(df=df, region_df=region_df, partitions=preprocessor.build_partitions(df))
+        if season not in _states:
+            df = helper.take_partitions(_dataset['df'], _dataset['partitions'], season)
+            _states[season] = types.MappingProxyType(dict(
+                df=df,
+                region_df=_dataset['region_df'],
+                base_version=datastore.dataset_version(),
+                version=datastore.dataset_version(),
+                cube=preprocessor.build_medal_cube(df),
+                medal_events=preprocessor.build_medal_events(df),
+                ranking=preprocessor.build_athlete_ranking(df),
+                row_index=preprocessor.build_row_index(df),
+                name_index=name_search.build_name_index(df),
+                trends=preprocessor.build_trends(df),
+                cache=result_cache.ResultCache(),
+            ))
+    return _states[season]
+
+
+def cached(state, func, *args, **kwargs):
+    with instrumentation.METRICS.span('helper', func.__name__):
+        return state['cache'].call(func, state['df'], *args, version=state['version'], **kwargs)
+
+
+def required(params, name):
+    if name not in params:
+        raise BadRequest(f"missing query parameter '{name}'")
+    return params[name]
+
+
+def is_number(value):
+    # str.isdigit() also accepts characters such as '²', which int() rejects
+    return value.isascii() and value.isdecimal()
+
+
+def medal_tally(state, params):
+    year = params.get('year', 'Overall')
+    if year != 'Overall' and not is_number(year):
+        raise BadRequest("year must be a number or 'Overall'")
+    return cached(state, helper.fetch_medal_tally, year, params.get('country', 'Overall'), cube=state['cube'])
+
+
+def trends(state, params):
+    col = required(params, 'col')
+    if col == 'gender':
+        return cached(state, helper.men_vs_women, trends=state['trends'])
+    if col not in ('region', 'Event', 'AthleteID'):
+        raise BadRequest("col must be one of region, Event, AthleteID, gender")
+    return cached(state, helper.data_over_time, col, trends=state['trends'])
+
+
+def top_athletes(state, params):
+    if 'country' in params:
+        return cached(state, helper.most_successful_countrywise, params['country'], ranking=state['ranking'])
+    return cached(state, helper.most_successful, params.get('sport', 'Overall'), ranking=state['ranking'])
+
+
+def country_heatmap(state, params):
+    return cached(state, helper.country_event_heatmap, required(params, 'country'), medal_events=state['medal_events'])
+
+
+def country_medals(state, params):
+    return cached(state, helper.yearwise_medal_tally, required(params, 'country'), medal_events=state['medal_events'])
+
+
+def athlete(state, params):
+    athlete_id = required(params, 'id')
+    if not is_number(athlete_id):
+        raise BadRequest("id must be a number")
+    return cached(state, helper.athlete_profile, int(athlete_id), row_index=state['row_index'])
+
+
+def athlete_search(state, params):
+    k = params.get('k', '10')
+    if not is_number(k):
+        raise BadRequest("k must be a number")
+    athlete_ids = state['name_index'].search(params.get('q', ''), k=min(int(k), 100))
+    return state['ranking']['attributes'].loc[athlete_ids, ['Name', 'region', 'Sport']].reset_index()
+
+
+def cache_stats(state, params):
+    return state['cache'].stats()
+
+
+def metrics(state, params):
+    if params.get('format', 'prometheus') == 'json':
+        return instrumentation.METRICS.snapshot()
+    return instrumentation.METRICS.prometheus()
+
+
+def medal_results(state, params, body):
+    """Apply a batch of live results; later queries see them in a new state, under a new version"""
+    year = required(params, 'year')
+    if not is_number(year):
+        raise BadRequest("year must be a number")
+    season = params.get('season', 'Summer')
+    games = {'Games': f"{year} {season}", 'Year': int(year), 'Season': season, 'City': required(params, 'city')}
+    try:
+        medals = pd.read_csv(io.BytesIO(body))
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise BadRequest(f"body is not a readable CSV: {e}")
+    missing = set(ingest.TOKYO_2020['medal_columns']) - set(medals.columns)
+    if missing:
+        raise BadRequest(f"missing columns: {', '.join(sorted(missing))}")
+
+    with _live_lock:
+        state = _states[season]
+        if season not in _live:
+            _live[season] = live.LiveAggregates(state['df'], state['region_df'], games, structures=state)
+        aggregates = _live[season]
+        added = aggregates.apply(medals, games)
+        if added:
+            # df stays the base frame: the row index carries the appended rows
+            state = _states[season] = types.MappingProxyType({
+                **state,
+                'df': aggregates.base,
+                'cube': aggregates.cube,
+                'medal_events': aggregates.medal_events,
+                'ranking': aggregates.ranking,
+                'row_index': aggregates.row_index,
+                'name_index': aggregates.name_index,
+                'trends': aggregates.trends,
+                'version': f"{state['base_version']}+{aggregates.batches}",
+            })
+        return {'added': added, 'batches': aggregates.batches, 'version': state['version']}
+
+
+ROUTES = {
+    '/medal-tally': medal_tally,
+    '/trends': trends,
+    '/top-athletes': top_athletes,
+    '/country-heatmap': country_heatmap,
+    '/country-medals': country_medals,
+    '/athlete': athlete,
+    '/athlete-search': athlete_search,
+    '/cache-stats': cache_stats,
+    '/metrics': metrics,
+}
+
+POST_ROUTES = {
+    '/medal-results': medal_results,
+}
+
+
+def to_json(value):
+    if isinstance(value, pd.DataFrame):
+        return value.to_json(orient='split', date_format='iso')
+    if isinstance(value, dict):
+        return '{%s}' % ','.join(f"{json.dumps(str(key))}:{to_json(item)}" for key, item in value.items())
+    return json.dumps(value, separators=(',', ':'))
+
+
+def to_arrow(frame):
+    if not isinstance(frame.index, pd.RangeIndex):
+        frame = frame.reset_index()
+    frame = frame.rename(columns=str)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def render(value, accept):
+    if isinstance(value, str):
+        return 200, "text/plain; version=0.0.4", value.encode()
+    if ARROW_TYPE in accept and isinstance(value, pd.DataFrame):
+        return 200, ARROW_TYPE, to_arrow(value)
+    return 200, "application/json", to_json(value).encode()
+
+
+async def respond(send, status, content_type, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type.encode()), (b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await asyncio.to_thread(load_state)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['path'] not in ROUTES and scope['path'] not in POST_ROUTES:
+        return await respond(send, 404, "application/json", b'{"error":"not found"}')
+    handler = {'GET': ROUTES, 'POST': POST_ROUTES}.get(scope['method'], {}).get(scope['path'])
+    if handler is None:
+        return await respond(send, 405, "application/json", b'{"error":"method not allowed"}')
+
+    params = {key: values[-1] for key, values in parse_qs(scope['query_string'].decode()).items()}
+    headers = dict(scope['headers'])
+    accept = headers.get(b'accept', b'').decode()
+    body = await read_body(receive) if scope['method'] == 'POST' else None
+
+    season = params.get('season', 'Summer')
+
+    def run():
+        if season not in preprocessor.SEASONS:
+            raise BadRequest(f"season must be one of {', '.join(preprocessor.SEASONS)}")
+        with instrumentation.METRICS.span('request', scope['path']):
+            if body is not None:
+                return render(handler(load_state(season), params, body), accept)
+            return render(handler(load_state(season), params), accept)
+
+    try:
+        status, content_type, body = await asyncio.to_thread(run)
+    except BadRequest as e:
+        status, content_type, body = 400, "application/json", to_json({'error': str(e)}).encode()
+    await respond(send, status, content_type, body)
@@ -1,13 +1,17 @@
 import streamlit as st
 import pandas as pd
+import datastore
 import preprocessor
+import precompute
+import result_cache
+import instrumentation
+import shared_dataset
 import helper
-import plotly.express as px
-import matplotlib.pyplot as plt
-import seaborn as sns
 import base64
 import os
+import time
 from pathlib import Path
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 # Page Configuration
 st.set_page_config(
@@ -52,15 +56,40 @@ def load_flag_image(country_name):
         return flag_path
     return None
 
+PAGES = {
+    'medals': '🏆 Medal Tally',
+    'overall': '📈 Overall Analysis',
+    'country': '🌍 Country Insights',
+    'athlete': '🧍 Athlete Profile',
+}
+# Columns each page reads itself; helpers declare their own (helper.uses)
+PAGE_COLUMNS = {
+    '🏆 Medal Tally': (),
+    '📈 Overall Analysis': ('Year', 'City', 'Sport', 'Event', 'region', 'AthleteID'),
+    '🌍 Country Insights': ('region', 'Medal'),
+    '🧍 Athlete Profile': ('Year', 'City', 'Sport', 'Event', 'Medal'),
+}
+
 # Data Loading with Caching
-@st.cache_data
-def load_data():
-    """Load and preprocess data with caching for performance"""
+@st.cache_resource
+def load_column_store():
+    """Snapshot columns shared by every session, each read on first use.
+
+    When `python shared_dataset.py publish` has run on this host, the
+    columns are mapped from the published generation instead, shared
+    with every other app process.
+    """
+    return datastore.ColumnStore(shared=shared_dataset.attach())
+
+def load_data(columns, season=None, year=None):
+    """Load `columns` of the preprocessed data from the on-disk snapshot (rebuilt when the CSVs change).
+
+    With season and/or year, only the rows of those Season/Year partitions.
+    Frames are shared by every session and must not be modified in place.
+    """
     try:
-        df = pd.read_csv("athlete_events_updated.csv")
-        region_df = pd.read_csv("noc_regions.csv")
-        df = preprocessor.preprocess(df, region_df)
-        return df, region_df
+        with span('load', 'frame'):
+            return load_column_store().frame(columns, season, year)
     except FileNotFoundError as e:
         st.error(f"Data file not found: {e}")
         st.stop()
@@ -68,9 +97,135 @@ def load_data():
         st.error(f"Error loading data: {e}")
         st.stop()
 
-# Load data
-with st.spinner("Loading Olympic data..."):
-    df, region_df = load_data()
+@st.cache_resource
+def load_medal_cube(season):
+    """Year x region x Medal counts, built once per process"""
+    frame = load_data(('Year', 'region', 'Medal'), season)
+    with span('load', 'medal_cube'):
+        return preprocessor.build_medal_cube(frame)
+
+@st.cache_resource
+def load_medal_events(season):
+    """Deduplicated medal events indexed by region, built once per process"""
+    frame = load_data(tuple(preprocessor.MEDAL_EVENT_KEYS) + ('region',), season)
+    with span('load', 'medal_events'):
+        return preprocessor.build_medal_events(frame)
+
+@st.cache_resource
+def load_row_index(season):
+    """Row positions per region, AthleteID, Sport and Year within a season, built once per process"""
+    # positions are the same in every column projection of the snapshot
+    frame = load_data(tuple(preprocessor.INDEX_COLUMNS), season)
+    with span('load', 'row_index'):
+        return preprocessor.build_row_index(frame)
+
+@st.cache_resource
+def load_athlete_ranking(season):
+    """Per-athlete medal counts and attributes for top-N queries, built once per process"""
+    frame = load_data(('AthleteID', 'Name', 'Sport', 'region', 'Medal'), season)
+    with span('load', 'athlete_ranking'):
+        return preprocessor.build_athlete_ranking(frame)
+
+@st.cache_resource
+def load_body_metrics(season):
+    """Athletes with numeric Height and Weight, built once per process"""
+    frame = load_data(helper.weight_v_height.columns, season)
+    with span('load', 'body_metrics'):
+        return preprocessor.build_body_metrics(frame)
+
+@st.cache_resource
+def load_trends(season):
+    """Distinct counts per Year behind the trend charts, built once per process"""
+    frame = load_data(preprocessor.trend_columns(), season)
+    with span('load', 'trends'):
+        return preprocessor.build_trends(frame)
+
+@st.cache_resource
+def load_name_index(season):
+    import name_search
+    frame = load_data(('AthleteID', 'Name', 'Medal'), season)
+    with span('load', 'name_index'):
+        return name_search.build_name_index(frame)
+
+@st.cache_resource
+def load_dataset_version():
+    return load_column_store().version
+
+@st.cache_resource
+def load_result_cache():
+    """Helper results shared by every session of this process"""
+    return result_cache.ResultCache()
+
+@st.cache_resource
+def load_metrics():
+    """Process-wide span histograms; served over HTTP when OLYMPICS_METRICS_PORT is set"""
+    port = os.environ.get("OLYMPICS_METRICS_PORT")
+    if port:
+        instrumentation.serve(int(port))
+    return instrumentation.METRICS
+
+def session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+def span(kind, name):
+    """Time a block into the process and session histograms"""
+    return load_metrics().span(kind, name, session_id())
+
+def plotly_chart(fig, name):
+    with span('render', name):
+        st.plotly_chart(fig, use_container_width=True)
+
+def styled_table(name, styler, **kwargs):
+    # a Styler is computed when the table is rendered, so that is what gets timed
+    with span('style', name):
+        st.dataframe(styler, **kwargs)
+
+def athlete_label(athlete_id):
+    """'Name (region, Sport)', so namesakes can be told apart"""
+    name, sport, region = load_athlete_ranking(season)['attributes'].loc[athlete_id, ['Name', 'Sport', 'region']]
+    return f"{name} ({region}, {sport})"
+
+def cached_helper(func, *args, **kwargs):
+    """Call a helper function through the result cache, on just the columns and season it reads"""
+    frame = load_data(helper.columns_for(func, *args, **kwargs), season)
+    with span('helper', func.__name__):
+        return load_result_cache().call(func, frame, *args, version=(load_dataset_version(), season), **kwargs)
+
+@st.cache_resource
+def load_artifact(view, key, version, season):
+    """Precomputed result, unpickled once per process; raises FileNotFoundError (not cached) while missing"""
+    result = precompute.load_artifact(view, key, version, season)
+    if result is None:
+        raise FileNotFoundError(precompute.artifact_path(version, season, view, key))
+    return result
+
+def precomputed(view, key, compute):
+    """Artifact from `python precompute.py` when available, otherwise computed on the spot"""
+    try:
+        with span('artifact', view):
+            return load_artifact(view, key, load_dataset_version(), season)
+    except FileNotFoundError:
+        return compute()
+
+@st.cache_resource
+def load_figure_cache():
+    import figure_cache
+    return figure_cache.FigureCache()
+
+def cached_figure(view, params, render):
+    """PNG bytes of a rendered figure from the on-disk figure cache"""
+    with span('render', view):
+        return load_figure_cache().get_or_render(view, {**params, 'season': season}, load_dataset_version(), render)
+
+def refresh_dataset():
+    """Drop every dataset-derived resource once a new shared generation is published or the CSVs change"""
+    store = load_column_store()
+    if shared_dataset.current_generation() != store.published or store.version != datastore.dataset_version():
+        for loader in (load_column_store, load_medal_cube, load_medal_events, load_row_index,
+                       load_athlete_ranking, load_body_metrics, load_trends, load_name_index,
+                       load_artifact, load_dataset_version):
+            loader.clear()
 
 # Sidebar Navigation
 st.sidebar.title("🏅 Olympic Explorer")
@@ -86,19 +241,40 @@ else:
 # Add background image (optional - uncomment if you want it)
 # add_bg_from_local("Bgimage.jpg")
 
-user_menu = st.sidebar.radio(
-    'Navigate through:',
-    ('🏆 Medal Tally', '📈 Overall Analysis', '🌍 Country Insights', '🧍 Athlete Profile')
-)
+# ?page=overall opens a page directly
+page_names = list(PAGES.values())
+start_page = PAGES.get(st.query_params.get("page"), page_names[0])
+user_menu = st.sidebar.radio('Navigate through:', page_names, index=page_names.index(start_page))
+
+# Summer or Winter Games; every page reads only that season's partitions (?season=winter)
+season_names = {name.lower(): name for name in preprocessor.SEASONS}
+start_season = season_names.get(st.query_params.get("season"), preprocessor.SEASONS[0])
+season = st.sidebar.radio('Olympic Games', preprocessor.SEASONS, index=preprocessor.SEASONS.index(start_season),
+                          horizontal=True)
 
 st.sidebar.markdown("---")
 
+# ?profile=cprofile or ?profile=sample profiles this rerun of the page; only with OLYMPICS_PROFILING=1 on the
+# server, so visitors cannot start profiling
+profile_mode = st.query_params.get("profile") if os.environ.get("OLYMPICS_PROFILING") == "1" else None
+profiler = instrumentation.PageProfiler(profile_mode, user_menu) if profile_mode in ('cprofile', 'sample') else None
+if profiler is not None:
+    profiler.start()
+page_start = time.perf_counter()
+
+# Only the selected page's columns are loaded
+with st.spinner("Loading Olympic data..."):
+    refresh_dataset()
+    df = load_data(PAGE_COLUMNS[user_menu], season)
+
 # Medal Tally
 if user_menu == '🏆 Medal Tally':
+    import plotly.express as px
+
     st.header("🏅 Medal Tally")
     
     try:
-        years, country = helper.country_year_list(df)
+        years, country = cached_helper(helper.country_year_list)
         
         selected_year = st.sidebar.selectbox("Select Year", years)
         selected_country = st.sidebar.selectbox("Select Country", country)
@@ -111,17 +287,17 @@ if user_menu == '🏆 Medal Tally':
             st.sidebar.markdown(f"🌍 **{selected_country}**")
         
         # Fetch medal tally
-        medal_tally = helper.fetch_medal_tally(df, selected_year, selected_country)
+        medal_tally = cached_helper(helper.fetch_medal_tally, selected_year, selected_country, cube=load_medal_cube(season))
         
         # Dynamic header
         if selected_year == 'Overall' and selected_country == 'Overall':
             st.subheader("Overall Medal Tally")
         elif selected_year != 'Overall' and selected_country == 'Overall':
-            st.subheader(f"Medal Tally in {selected_year} Olympics")
+            st.subheader(f"Medal Tally in {selected_year} {season} Olympics")
         elif selected_year == 'Overall' and selected_country != 'Overall':
             st.subheader(f"{selected_country}'s Overall Performance")
         else:
-            st.subheader(f"{selected_country}'s Performance in {selected_year} Olympics")
+            st.subheader(f"{selected_country}'s Performance in {selected_year} {season} Olympics")
         
         # Display medal tally with better styling
         if not medal_tally.empty:
@@ -129,7 +305,8 @@ if user_menu == '🏆 Medal Tally':
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                st.dataframe(
+                styled_table(
+                    'medal_tally',
                     medal_tally.style.format({
                         'Gold': '{:d}',
                         'Silver': '{:d}',
@@ -161,23 +338,25 @@ if user_menu == '🏆 Medal Tally':
                     color_discrete_map={'Gold': '#FFD700', 'Silver': '#C0C0C0', 'Bronze': '#CD7F32'}
                 )
                 fig.update_layout(height=500, xaxis_tickangle=-45)
-                st.plotly_chart(fig, use_container_width=True)
+                plotly_chart(fig, 'medal_distribution')
         else:
             st.info("No medal data available for the selected filters.")
         
-        # 2020 Olympics data section
-        st.subheader("🏅 Tokyo 2020 Olympics - Medal Count by Region")
-        try:
-            test_df = df[(df['Year'] == 2020) & (df['Medal'].notnull())]
-            if not test_df.empty:
-                grouped = test_df.groupby(['region', 'Medal']).size().unstack(fill_value=0)
-                grouped['Total'] = grouped.sum(axis=1)
-                grouped = grouped.sort_values('Total', ascending=False)
-                st.dataframe(grouped, use_container_width=True)
-            else:
-                st.info("No data available for 2020 Olympics.")
-        except Exception as e:
-            st.warning(f"Could not load 2020 data: {e}")
+        # Tokyo 2020 section (a Summer Games)
+        if season == 'Summer':
+            st.subheader("🏅 Tokyo 2020 Olympics - Medal Count by Region")
+            try:
+                medal_cube = load_medal_cube(season)
+                if 2020 in medal_cube.index.get_level_values('Year'):
+                    grouped = medal_cube.xs(2020, level='Year')
+                    grouped = grouped.loc[:, grouped.sum() > 0].copy()
+                    grouped['Total'] = grouped.sum(axis=1)
+                    grouped = grouped.sort_values('Total', ascending=False)
+                    st.dataframe(grouped, use_container_width=True)
+                else:
+                    st.info("No data available for 2020 Olympics.")
+            except Exception as e:
+                st.warning(f"Could not load 2020 data: {e}")
     
     except Exception as e:
         st.error(f"An error occurred: {e}")
@@ -185,6 +364,9 @@ if user_menu == '🏆 Medal Tally':
 
 # Overall Analysis
 elif user_menu == '📈 Overall Analysis':
+    import plotly.express as px
+    import figure_cache
+
     st.header("📊 Olympic Trends & Statistics")
     
     # Key Metrics
@@ -207,7 +389,7 @@ elif user_menu == '📈 Overall Analysis':
         nations = df['region'].nunique()
         st.metric("Nations", nations, help="Number of participating countries/regions")
     with col6:
-        athletes = df['Name'].nunique()
+        athletes = df['AthleteID'].nunique()
         st.metric("Athletes", f"{athletes:,}", help="Total number of unique athletes")
     
     st.markdown("---")
@@ -217,7 +399,8 @@ elif user_menu == '📈 Overall Analysis':
     
     try:
         # Participating Nations
-        nations_data = helper.data_over_time(df, 'region')
+        nations_data = precomputed('data_over_time', 'region',
+                                   lambda: cached_helper(helper.data_over_time, 'region', trends=load_trends(season)))
         if not nations_data.empty:
             fig_nations = px.line(
                 nations_data, 
@@ -229,10 +412,11 @@ elif user_menu == '📈 Overall Analysis':
             )
             fig_nations.update_traces(line_color='#1f77b4', line_width=3)
             fig_nations.update_layout(height=400)
-            st.plotly_chart(fig_nations, use_container_width=True)
+            plotly_chart(fig_nations, 'nations_over_time')
         
         # Events Over Time
-        events_data = helper.data_over_time(df, 'Event')
+        events_data = precomputed('data_over_time', 'Event',
+                                  lambda: cached_helper(helper.data_over_time, 'Event', trends=load_trends(season)))
         if not events_data.empty:
             fig_events = px.line(
                 events_data, 
@@ -244,22 +428,23 @@ elif user_menu == '📈 Overall Analysis':
             )
             fig_events.update_traces(line_color='#ff7f0e', line_width=3)
             fig_events.update_layout(height=400)
-            st.plotly_chart(fig_events, use_container_width=True)
+            plotly_chart(fig_events, 'events_over_time')
         
         # Athletes Over Time
-        athletes_data = helper.data_over_time(df, 'Name')
+        athletes_data = precomputed('data_over_time', 'AthleteID',
+                                    lambda: cached_helper(helper.data_over_time, 'AthleteID', trends=load_trends(season)))
         if not athletes_data.empty:
             fig_athletes = px.line(
                 athletes_data, 
                 x="Edition", 
-                y="Name",
+                y="AthleteID",
                 title="Athletes Over Time",
-                labels={'Name': 'Number of Athletes', 'Edition': 'Olympic Edition'},
+                labels={'AthleteID': 'Number of Athletes', 'Edition': 'Olympic Edition'},
                 markers=True
             )
             fig_athletes.update_traces(line_color='#2ca02c', line_width=3)
             fig_athletes.update_layout(height=400)
-            st.plotly_chart(fig_athletes, use_container_width=True)
+            plotly_chart(fig_athletes, 'athletes_over_time')
     except Exception as e:
         st.warning(f"Error displaying trends: {e}")
     
@@ -268,31 +453,11 @@ elif user_menu == '📈 Overall Analysis':
     # Event Distribution Heatmap
     st.subheader("🔥 Event Distribution by Sport Over Years")
     try:
-        event_heatmap = df.drop_duplicates(['Year', 'Sport', 'Event'])
-        pivot_data = event_heatmap.pivot_table(
-            index='Sport', 
-            columns='Year', 
-            values='Event', 
-            aggfunc='count'
-        ).fillna(0).astype(int)
+        pivot_data = precomputed('event_heatmap', 'Overall', lambda: cached_helper(helper.event_heatmap))
         
         if not pivot_data.empty:
-            fig, ax = plt.subplots(figsize=(16, 12))
-            sns.heatmap(
-                pivot_data,
-                annot=True,
-                fmt='d',
-                linewidths=0.5,
-                cmap="YlGnBu",
-                cbar_kws={'label': 'Number of Events'},
-                ax=ax
-            )
-            ax.set_title("Event Distribution by Sport and Year", fontsize=16, pad=20)
-            ax.set_xlabel("Year", fontsize=12)
-            ax.set_ylabel("Sport", fontsize=12)
-            plt.xticks(rotation=45)
-            plt.yticks(rotation=0)
-            st.pyplot(fig)
+            st.image(cached_figure('event_heatmap', {}, lambda: figure_cache.render_event_heatmap(pivot_data)),
+                     use_container_width=True)
         else:
             st.info("No data available for the heatmap.")
     except Exception as e:
@@ -307,9 +472,13 @@ elif user_menu == '📈 Overall Analysis':
         sport_list.insert(0, 'Overall')
         selected_sport = st.selectbox('Select a Sport', sport_list, key='sport_select')
         
-        top_athletes = helper.most_successful(df, selected_sport)
+        top_athletes = precomputed(
+            'most_successful', selected_sport,
+            lambda: cached_helper(helper.most_successful, selected_sport, ranking=load_athlete_ranking(season))
+        )
         if not top_athletes.empty:
-            st.dataframe(
+            styled_table(
+                'top_athletes',
                 top_athletes.style.format({'Medals': '{:d}'}),
                 use_container_width=True,
                 height=400
@@ -321,6 +490,9 @@ elif user_menu == '📈 Overall Analysis':
 
 # Country Insights
 elif user_menu == '🌍 Country Insights':
+    import plotly.express as px
+    import figure_cache
+
     st.header("🌍 Country-wise Performance Analysis")
     
     try:
@@ -335,7 +507,7 @@ elif user_menu == '🌍 Country Insights':
             st.sidebar.markdown(f"🌍 **{selected_country}**")
         
         # Country statistics
-        country_data = df[df['region'] == selected_country]
+        country_data = helper.take_rows(df, load_row_index(season), 'region', selected_country)
         if not country_data.empty:
             col1, col2, col3, col4 = st.columns(4)
             with col1:
@@ -356,7 +528,10 @@ elif user_menu == '🌍 Country Insights':
         # Medal Tally Over Years
         st.subheader(f"{selected_country} - Medal Tally Over Years")
         try:
-            country_df = helper.yearwise_medal_tally(df, selected_country)
+            country_df = precomputed(
+                'yearwise_medal_tally', selected_country,
+                lambda: cached_helper(helper.yearwise_medal_tally, selected_country, medal_events=load_medal_events(season))
+            )
             if not country_df.empty:
                 fig = px.line(
                     country_df, 
@@ -368,7 +543,7 @@ elif user_menu == '🌍 Country Insights':
                 )
                 fig.update_traces(line_color='#FFD700', line_width=3, marker_size=8)
                 fig.update_layout(height=400)
-                st.plotly_chart(fig, use_container_width=True)
+                plotly_chart(fig, 'country_medals')
             else:
                 st.info(f"No medal data available for {selected_country}.")
         except Exception as e:
@@ -377,23 +552,14 @@ elif user_menu == '🌍 Country Insights':
         # Top Sports Heatmap
         st.subheader(f"{selected_country}'s Performance by Sport Over Years")
         try:
-            heatmap_data = helper.country_event_heatmap(df, selected_country)
+            heatmap_data = precomputed(
+                'country_event_heatmap', selected_country,
+                lambda: cached_helper(helper.country_event_heatmap, selected_country, medal_events=load_medal_events(season))
+            )
             if not heatmap_data.empty:
-                fig, ax = plt.subplots(figsize=(16, 10))
-                sns.heatmap(
-                    heatmap_data, 
-                    annot=True, 
-                    fmt='g',
-                    cmap="crest",
-                    cbar_kws={'label': 'Number of Medals'},
-                    ax=ax
-                )
-                ax.set_title(f"{selected_country}'s Medal Performance by Sport and Year", fontsize=14, pad=20)
-                ax.set_xlabel("Year", fontsize=12)
-                ax.set_ylabel("Sport", fontsize=12)
-                plt.xticks(rotation=45)
-                plt.yticks(rotation=0)
-                st.pyplot(fig)
+                st.image(cached_figure('country_heatmap', {'country': selected_country},
+                                       lambda: figure_cache.render_country_heatmap(heatmap_data, selected_country)),
+                         use_container_width=True)
             else:
                 st.info(f"No heatmap data available for {selected_country}.")
         except Exception as e:
@@ -404,9 +570,13 @@ elif user_menu == '🌍 Country Insights':
         # Top Athletes
         st.subheader(f"🏆 Top 10 Athletes from {selected_country}")
         try:
-            top_athletes = helper.most_successful_countrywise(df, selected_country)
+            top_athletes = precomputed(
+                'most_successful_countrywise', selected_country,
+                lambda: cached_helper(helper.most_successful_countrywise, selected_country, ranking=load_athlete_ranking(season))
+            )
             if not top_athletes.empty:
-                st.dataframe(
+                styled_table(
+                    'top_athletes_countrywise',
                     top_athletes.style.format({'Medals': '{:d}'}),
                     use_container_width=True,
                     height=400
@@ -421,20 +591,23 @@ elif user_menu == '🌍 Country Insights':
 
 # Athlete Profile
 elif user_menu == '🧍 Athlete Profile':
+    import plotly.express as px
+    import figure_cache
+
     st.header("🧍 Individual Athlete Insights")
     
     try:
-        athlete_df = df.drop_duplicates(subset=['Name', 'region'])
-        athlete_names = sorted(athlete_df['Name'].dropna().unique())
+        query = st.text_input("Search for an Athlete", placeholder="e.g. Phelps, or BOLT Usain")
+        athlete_ids = load_name_index(season).search(query, k=25)
         
-        if not athlete_names:
-            st.warning("No athlete data available.")
+        if not athlete_ids:
+            st.warning(f"No athletes match '{query}'.")
         else:
-            selected_athlete = st.selectbox("Select an Athlete", athlete_names)
-            athlete_data = df[df['Name'] == selected_athlete]
+            selected_athlete = st.selectbox("Select an Athlete", athlete_ids, format_func=athlete_label)
+            athlete_data = helper.take_rows(df, load_row_index(season), 'AthleteID', selected_athlete)
             
             if athlete_data.empty:
-                st.warning(f"No data found for {selected_athlete}")
+                st.warning(f"No data found for {athlete_label(selected_athlete)}")
             else:
                 # Athlete Statistics
                 years = sorted(athlete_data['Year'].unique())
@@ -485,7 +658,7 @@ elif user_menu == '🧍 Athlete Profile':
                             color_discrete_map={'Gold': '#FFD700', 'Silver': '#C0C0C0', 'Bronze': '#CD7F32'}
                         )
                         fig.update_layout(height=400)
-                        st.plotly_chart(fig, use_container_width=True)
+                        plotly_chart(fig, 'athlete_medals')
                     
                     # Events & Medals table
                     st.subheader("📋 Events & Medals by Year")
@@ -503,30 +676,14 @@ elif user_menu == '🧍 Athlete Profile':
                 selected_sport = st.selectbox("Select Sport", sport_list, key='athlete_sport')
                 
                 try:
-                    sport_df = helper.weight_v_height(df, selected_sport)
-                    sport_df = sport_df[pd.to_numeric(sport_df['Height'], errors='coerce').notnull()]
-                    sport_df = sport_df[pd.to_numeric(sport_df['Weight'], errors='coerce').notnull()]
+                    sport_df = cached_helper(helper.weight_v_height, selected_sport, body_metrics=load_body_metrics(season))
                     
                     if not sport_df.empty:
-                        sport_df['Height'] = sport_df['Height'].astype(float)
-                        sport_df['Weight'] = sport_df['Weight'].astype(float)
-                        
-                        fig, ax = plt.subplots(figsize=(10, 6))
-                        sns.scatterplot(
-                            data=sport_df, 
-                            x='Weight', 
-                            y='Height', 
-                            hue='Medal', 
-                            style='Sex', 
-                            s=60, 
-                            ax=ax,
-                            palette={'Gold': '#FFD700', 'Silver': '#C0C0C0', 'Bronze': '#CD7F32', 'No Medal': '#808080'}
-                        )
-                        ax.set_title(f"Height vs Weight Distribution ({selected_sport})", fontsize=14)
-                        ax.set_xlabel("Weight (kg)", fontsize=12)
-                        ax.set_ylabel("Height (cm)", fontsize=12)
-                        plt.legend(title='Medal / Gender', bbox_to_anchor=(1.05, 1), loc='upper left')
-                        st.pyplot(fig)
+                        # large sports are drawn as a sample over a density background
+                        st.image(cached_figure('body_metrics', {'sport': selected_sport},
+                                               lambda: figure_cache.render_body_metrics(
+                                                   sport_df, helper.sample_body_metrics(sport_df), selected_sport)),
+                                 use_container_width=True)
                     else:
                         st.info(f"No height/weight data available for {selected_sport}.")
                 except Exception as e:
@@ -537,7 +694,8 @@ elif user_menu == '🧍 Athlete Profile':
                 # Gender Participation Trends
                 st.subheader("👥 Men vs Women Participation Over the Years")
                 try:
-                    gender_df = helper.men_vs_women(df)
+                    gender_df = precomputed('men_vs_women', 'Overall',
+                                            lambda: cached_helper(helper.men_vs_women, trends=load_trends(season)))
                     if not gender_df.empty:
                         fig = px.line(
                             gender_df, 
@@ -549,7 +707,7 @@ elif user_menu == '🧍 Athlete Profile':
                         )
                         fig.update_traces(line_width=3)
                         fig.update_layout(height=400)
-                        st.plotly_chart(fig, use_container_width=True)
+                        plotly_chart(fig, 'gender_trends')
                     else:
                         st.info("No gender participation data available.")
                 except Exception as e:
@@ -557,3 +715,18 @@ elif user_menu == '🧍 Athlete Profile':
     
     except Exception as e:
         st.error(f"An error occurred: {e}")
+
+load_metrics().observe('page', user_menu, time.perf_counter() - page_start, session_id())
+if profiler is not None:
+    profile_path = profiler.stop()
+    st.sidebar.caption(f"Profile written: {profile_path.name}")
+    st.sidebar.download_button("Download profile", profile_path.read_bytes(), file_name=profile_path.name)
+
+# Result cache statistics and timings, shown with ?debug=1
+if st.query_params.get("debug"):
+    with st.sidebar.expander("Timings (this session)"):
+        st.json(load_metrics().snapshot(session_id()))
+    with st.sidebar.expander("Result cache"):
+        st.json(load_result_cache().stats())
+    with st.sidebar.expander("Loaded columns"):
+        st.json(load_column_store().stats())
@@ -0,0 +1,42 @@
+"""Interned-key medal attribution vs the old string merge on the Tokyo 2020 files.
+
+Run from the project root:  python -m benchmarks.bench_attribution
+"""
+import time
+
+import pandas as pd
+
+import ingest
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def string_merge(athletes, medals):
+    # the left merge merge_tokyo_data.py used before the attribution stage
+    return athletes.merge(medals[['Name', 'Sport', 'NOC', 'Medal']], how='left', on=['Name', 'Sport', 'NOC'])
+
+
+def main():
+    source = ingest.TOKYO_2020
+    athletes = pd.read_csv(source['athletes']).rename(columns=source['athlete_columns'])
+    medals = pd.read_csv(source['medals']).rename(columns=source['medal_columns'])
+
+    merge_time, merged = best_of(lambda: string_merge(athletes, medals))
+    attribution_time, (attributed, report) = best_of(lambda: ingest.attribute_medals(athletes, medals))
+
+    print(f"string merge:  {merge_time * 1e3:8.1f} ms, {len(merged):,} rows, "
+          f"{merged['Medal'].notna().sum():,} medals attached")
+    print(f"attribution:   {attribution_time * 1e3:8.1f} ms, {len(attributed):,} rows, "
+          f"{attributed['Medal'].notna().sum():,} medals attached")
+    print(f"report: {report}")
+
+
+if __name__ == '__main__':
+    main()
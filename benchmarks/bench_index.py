@@ -0,0 +1,45 @@
+"""Boolean-mask vs row-index lookup latency for every region.
+
+Run from the project root:  python -m benchmarks.bench_index
+"""
+import time
+
+import numpy as np
+
+import datastore
+import helper
+import preprocessor
+
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    df, _ = datastore.load_dataset()
+
+    start = time.perf_counter()
+    row_index = preprocessor.build_row_index(df)
+    print(f"build_row_index: {(time.perf_counter() - start) * 1e3:.1f} ms for {len(df):,} rows")
+
+    regions = sorted(df['region'].dropna().unique().tolist())
+    mask_times, index_times = [], []
+    for region in regions:
+        mask_times.append(best_of(lambda: df[df['region'] == region]))
+        index_times.append(best_of(lambda: helper.take_rows(df, row_index, 'region', region)))
+
+    mask_times = np.array(mask_times) * 1e3
+    index_times = np.array(index_times) * 1e3
+    print(f"{'':8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, times in [('mask', mask_times), ('index', index_times)]:
+        print(f"{label:8}{times.mean():10.3f}{np.median(times):10.3f}{np.percentile(times, 99):10.3f}")
+    print(f"speedup: {mask_times.sum() / index_times.sum():.1f}x over {len(regions)} regions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Athlete name search: correctness against a full scan, and query latency.
+
+Checks that every sampled name finds its athlete (typed as is and in
+Tokyo 'SURNAME Given' order), that prefix results equal a brute-force
+scan of all names, and reports per-query latency for type-ahead prefixes
+and misspelt names.
+
+Run from the project root:  python -m benchmarks.bench_search
+"""
+import time
+
+import numpy as np
+
+import datastore
+import name_search
+
+SAMPLE = 2000
+K = 10
+
+
+def brute_force_prefix(index, key):
+    query = key.split()
+    return {
+        name for name, name_key in zip(index.names, index.keys)
+        if all(any(token.startswith(q) for token in name_key.split()) for q in query)
+    }
+
+
+def latency(index, queries):
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query, K)
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1e3
+
+
+def main():
+    df, _ = datastore.load_dataset()
+
+    start = time.perf_counter()
+    index = name_search.build_name_index(df)
+    print(f"build_name_index: {(time.perf_counter() - start) * 1e3:.0f} ms for {len(index):,} names")
+
+    rng = np.random.default_rng(0)
+    positions = rng.choice(len(index), size=min(SAMPLE, len(index)), replace=False)
+    sample = index.names[positions]
+
+    missing = []
+    for name, athlete in zip(sample, index.athletes[positions]):
+        tokens = name.split()
+        tokyo_style = ' '.join([tokens[-1].upper()] + tokens[:-1])
+        # a key shared by more than K athletes cannot fit in the top K
+        if np.count_nonzero(index.keys == name_search.fold(name)) > K:
+            continue
+        for query in (name, tokyo_style):
+            if athlete not in index.search(query, K):
+                missing.append(query)
+    print(f"exact: {len(missing)} of {len(sample) * 2} name queries missed their athlete")
+
+    mismatched = 0
+    for name in sample[:100]:
+        key = name_search.fold(name[:4])
+        if not key:
+            continue
+        expected = brute_force_prefix(index, key)
+        found = set(index.names[np.unique(index.prefix(key.split()))])
+        mismatched += found != expected
+    print(f"prefix: {100 - mismatched}/100 prefix queries equal a full scan")
+
+    prefixes = [name[:rng.integers(1, len(name) + 1)] for name in sample]
+    typos = []
+    for name in sample:
+        pos = rng.integers(0, len(name))
+        typos.append(name[:pos] + 'x' + name[pos + 1:])
+    print(f"{'':10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, queries in [('prefix', prefixes), ('typo', typos)]:
+        times = latency(index, queries)
+        print(f"{label:10}{times.mean():10.3f}{np.median(times):10.3f}{np.percentile(times, 99):10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Per-process memory with and without the shared dataset.
+
+Starts N worker processes that each load every column of the dataset,
+either from the Parquet snapshot (a private copy each) or attached to
+the generation published by shared_dataset.py, touch every column, and
+report their load time and memory from /proc/self/smaps_rollup: private
+bytes are paid once per process, while the mapped columns show up as
+shared and are divided between processes in PSS. Linux only.
+
+Run from the project root:  python -m benchmarks.bench_shared --workers 4
+"""
+import argparse
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import datastore
+import shared_dataset
+
+
+def smaps_rollup():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return fields
+
+
+def worker(mode, directory):
+    start = time.perf_counter()
+    if mode == 'shared':
+        store = datastore.ColumnStore(shared=shared_dataset.attach(directory))
+        columns = store.shared.columns
+    else:
+        store = datastore.ColumnStore()
+        columns = list(datastore.read_snapshot(store.path).columns)
+    df = store.frame(columns)
+    load_seconds = time.perf_counter() - start
+    for col in df.columns:
+        df[col].value_counts()
+    memory = smaps_rollup()
+    # hold the mapping until every worker has measured
+    time.sleep(1)
+    return load_seconds, memory['Private_Clean'] + memory['Private_Dirty'], memory['Pss']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-process memory with and without the shared dataset")
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    df, _ = datastore.load_dataset()
+    with tempfile.TemporaryDirectory() as directory:
+        shared_dataset.publish(df, datastore.dataset_version(), directory)
+        print(f"{len(df):,} rows, {args.workers} workers")
+        print(f"{'mode':10}{'load ms':>10}{'private MB':>12}{'PSS MB':>10}")
+        for mode in ['parquet', 'shared']:
+            # spawned, so no worker inherits the parent's copy of the frame
+            with ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = list(pool.map(worker, [mode] * args.workers, [directory] * args.workers))
+            load = sum(r[0] for r in results) / len(results) * 1e3
+            private = sum(r[1] for r in results) / len(results)
+            pss = sum(r[2] for r in results) / len(results)
+            print(f"{mode:10}{load:10.1f}{private:12.1f}{pss:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Load test for the query API: p50/p99 latency and requests/sec.
+
+Runs in-process against api.app by default, or against a running server
+with --url (e.g. after `uvicorn api:app --workers 4`). Requires httpx.
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+import numpy as np
+
+import api
+
+
+def request_mix(state, count, seed=0):
+    rng = random.Random(seed)
+    df = state['df']
+    years = ['Overall'] + sorted(int(year) for year in df['Year'].unique())
+    regions = sorted(df['region'].dropna().unique().tolist())
+    sports = ['Overall'] + sorted(df['Sport'].dropna().unique().tolist())
+    athlete_ids = df['AthleteID'].drop_duplicates().sample(200, random_state=seed, replace=True).tolist()
+
+    templates = [
+        lambda: ('/medal-tally', {'year': rng.choice(years), 'country': rng.choice(['Overall'] + regions)}),
+        lambda: ('/trends', {'col': rng.choice(['region', 'Event', 'AthleteID', 'gender'])}),
+        lambda: ('/top-athletes', {'sport': rng.choice(sports)}),
+        lambda: ('/top-athletes', {'country': rng.choice(regions)}),
+        lambda: ('/country-heatmap', {'country': rng.choice(regions)}),
+        lambda: ('/country-medals', {'country': rng.choice(regions)}),
+        lambda: ('/athlete', {'id': rng.choice(athlete_ids)}),
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
+
+
+async def run(client, requests, concurrency):
+    queue = asyncio.Queue()
+    for item in requests:
+        queue.put_nowait(item)
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            path, params = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+async def main(args):
+    state = api.load_state()
+    requests = request_mix(state, args.requests)
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://api", timeout=60)
+
+    async with client:
+        latencies, errors, elapsed = await run(client, requests, args.concurrency)
+
+    ms = latencies * 1e3
+    print(f"{len(ms)} requests, {args.concurrency} concurrent, {errors} errors")
+    print(f"p50 {np.percentile(ms, 50):.2f} ms  p99 {np.percentile(ms, 99):.2f} ms  max {ms.max():.2f} ms")
+    print(f"{len(ms) / elapsed:.1f} requests/sec")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test for the query API")
+    parser.add_argument('--url', help="base URL of a running server (default: in-process)")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,210 @@
+"""Benchmark suite for the data loading path and every helper function.
+
+Each case runs a helper over a representative argument set (all years,
+the 20 largest regions, all sports) and records total wall time, mean
+time per call and peak traced memory. Full-frame helpers and their
+precomputed fast paths are separate cases.
+
+    python -m benchmarks.run                              # print results
+    python -m benchmarks.run --save-baseline base.json
+    python -m benchmarks.run --compare base.json          # exit 1 on regression
+    python -m benchmarks.run --scale 10 --only fetch_medal_tally
+
+--scale N tiles the raw dataset N times (athlete names made distinct per
+copy) before preprocessing, to see how each path scales with rows.
+--athlete-csv runs against another file in the same schema, such as one
+written by benchmarks.synthetic.
+"""
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import datastore
+import helper
+import identity
+import preprocessor
+
+REGRESSION_THRESHOLD = 1.25
+
+
+def scale_frame(raw, factor):
+    """Tile the raw athlete rows factor times, renaming and renumbering athletes in each copy"""
+    if factor == 1:
+        return raw
+    copies = []
+    for i in range(factor):
+        copy = raw.copy()
+        if i:
+            copy['Name'] = copy['Name'].astype(str) + f" #{i}"
+            copy['ID'] = copy['ID'] + i * raw['ID'].max()
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def load_inputs(scale, athlete_csv=datastore.ATHLETE_CSV):
+    raw = pd.read_csv(athlete_csv, low_memory=False)
+    region_df = pd.read_csv(datastore.REGION_CSV)
+    return scale_frame(raw, scale), region_df
+
+
+def prepare(raw, region_df):
+    df = preprocessor.apply_schema(preprocessor.preprocess(raw, region_df).reset_index(drop=True))
+    df['AthleteID'], _ = identity.resolve_athletes(df)
+    return {
+        'df': df,
+        'cube': preprocessor.build_medal_cube(df),
+        'medal_events': preprocessor.build_medal_events(df),
+        'ranking': preprocessor.build_athlete_ranking(df),
+        'row_index': preprocessor.build_row_index(df),
+        'body_metrics': preprocessor.build_body_metrics(df),
+        'trends': preprocessor.build_trends(df),
+        'partitions': preprocessor.build_partitions(df),
+    }
+
+
+def cases(raw, region_df, ctx, scale, athlete_csv):
+    """Yield (name, function, list of argument tuples)"""
+    df = ctx['df']
+    years = ['Overall'] + sorted(int(year) for year in df['Year'].unique())
+    regions = df['region'].value_counts().head(20).index.tolist()
+    sports = ['Overall'] + sorted(df['Sport'].dropna().unique().tolist())
+    athlete_ids = df['AthleteID'].value_counts().head(20).index.tolist()
+    editions = ctx['partitions'].index.tolist()
+
+    yield 'preprocess', lambda: preprocessor.preprocess(raw, region_df), [()]
+    if scale == 1:
+        def cold_load():
+            with tempfile.TemporaryDirectory() as cache_dir:
+                datastore.load_dataset(athlete_csv, cache_dir=cache_dir)
+        yield 'load_data[cold]', cold_load, [()]
+        datastore.load_dataset(athlete_csv)
+        yield 'load_data[snapshot]', lambda: datastore.load_dataset(athlete_csv), [()]
+        yield 'load_data[columns]', lambda func, *args: datastore.load_columns(helper.columns_for(func, *args), athlete_csv=athlete_csv), \
+            [(helper.country_year_list,), (helper.event_heatmap,), (helper.weight_v_height, 'Overall')]
+        yield 'load_data[partition]', lambda s, y: datastore.load_columns(helper.fetch_medal_tally.columns, s, y,
+                                                                           athlete_csv=athlete_csv), editions[::8]
+
+    yield 'filter[Season, Year]', lambda s, y: df[(df['Season'] == s) & (df['Year'] == y)], editions
+    yield 'take_partitions', lambda s, y: helper.take_partitions(df, ctx['partitions'], s, y), editions
+    yield 'country_year_list', lambda: helper.country_year_list(df), [()]
+    yield 'fetch_medal_tally', lambda y, c: helper.fetch_medal_tally(df, y, c), \
+        [(y, 'Overall') for y in years] + [('Overall', c) for c in regions]
+    yield 'fetch_medal_tally[cube]', lambda y, c: helper.fetch_medal_tally(df, y, c, cube=ctx['cube']), \
+        [(y, 'Overall') for y in years] + [('Overall', c) for c in regions]
+    yield 'data_over_time', lambda col: helper.data_over_time(df, col), [('region',), ('Event',), ('AthleteID',)]
+    yield 'data_over_time[trends]', lambda col: helper.data_over_time(df, col, trends=ctx['trends']), \
+        [('region',), ('Event',), ('AthleteID',)]
+    yield 'event_heatmap', lambda: helper.event_heatmap(df), [()]
+    yield 'men_vs_women', lambda: helper.men_vs_women(df), [()]
+    yield 'men_vs_women[trends]', lambda: helper.men_vs_women(df, trends=ctx['trends']), [()]
+    yield 'build_trends', lambda: preprocessor.build_trends(df), [()]
+    yield 'most_successful', lambda s: helper.most_successful(df, s), [(s,) for s in sports]
+    yield 'most_successful[ranking]', lambda s: helper.most_successful(df, s, ranking=ctx['ranking']), \
+        [(s,) for s in sports]
+    yield 'most_successful_countrywise', lambda c: helper.most_successful_countrywise(df, c), [(c,) for c in regions]
+    yield 'most_successful_countrywise[ranking]', \
+        lambda c: helper.most_successful_countrywise(df, c, ranking=ctx['ranking']), [(c,) for c in regions]
+    yield 'yearwise_medal_tally', lambda c: helper.yearwise_medal_tally(df, c), [(c,) for c in regions]
+    yield 'yearwise_medal_tally[medal_events]', \
+        lambda c: helper.yearwise_medal_tally(df, c, medal_events=ctx['medal_events']), [(c,) for c in regions]
+    yield 'country_event_heatmap', lambda c: helper.country_event_heatmap(df, c), [(c,) for c in regions]
+    yield 'country_event_heatmap[medal_events]', \
+        lambda c: helper.country_event_heatmap(df, c, medal_events=ctx['medal_events']), [(c,) for c in regions]
+    yield 'weight_v_height', lambda s: helper.weight_v_height(df, s), [(s,) for s in sports]
+    yield 'weight_v_height[body_metrics]', lambda s: helper.weight_v_height(df, s, body_metrics=ctx['body_metrics']), \
+        [(s,) for s in sports]
+    yield 'sample_body_metrics', lambda s: helper.sample_body_metrics(
+        helper.weight_v_height(df, s, body_metrics=ctx['body_metrics'])), [(s,) for s in sports]
+    yield 'resolve_athletes', lambda: identity.resolve_athletes(df), [()]
+    yield 'athlete_profile', lambda a: helper.athlete_profile(df, a), [(a,) for a in athlete_ids]
+    yield 'athlete_profile[row_index]', lambda a: helper.athlete_profile(df, a, row_index=ctx['row_index']), \
+        [(a,) for a in athlete_ids]
+
+
+def measure(func, arg_sets):
+    start = time.perf_counter()
+    for args in arg_sets:
+        func(*args)
+    wall = time.perf_counter() - start
+
+    # memory in a second pass; tracing slows the calls down
+    tracemalloc.start()
+    for args in arg_sets:
+        func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'calls': len(arg_sets), 'wall_s': wall, 'mean_ms': 1e3 * wall / len(arg_sets), 'peak_mb': peak / 2 ** 20}
+
+
+def run(scale=1, only=None, athlete_csv=datastore.ATHLETE_CSV):
+    raw, region_df = load_inputs(scale, athlete_csv)
+    start = time.perf_counter()
+    ctx = prepare(raw, region_df)
+    results = {'prepare': {'calls': 1, 'wall_s': time.perf_counter() - start}}
+    results['prepare']['mean_ms'] = 1e3 * results['prepare']['wall_s']
+
+    for name, func, arg_sets in cases(raw, region_df, ctx, scale, athlete_csv):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(func, arg_sets)
+        print(f"{name:40}{results[name]['calls']:6} calls{results[name]['mean_ms']:12.2f} ms/call"
+              f"{results[name]['peak_mb']:10.1f} MB peak", flush=True)
+    return {
+        'rows': len(ctx['df']),
+        'scale': scale,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'results': results,
+    }
+
+
+def compare(report, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print per-case ratios against the baseline; return the names that regressed"""
+    regressions = []
+    print(f"\n{'case':40}{'baseline ms':>14}{'current ms':>14}{'ratio':>8}")
+    for name, current in report['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        ratio = current['mean_ms'] / previous['mean_ms'] if previous['mean_ms'] else float('inf')
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{name:40}{previous['mean_ms']:14.2f}{current['mean_ms']:14.2f}{ratio:8.2f}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the loading path and helper functions")
+    parser.add_argument('--scale', type=int, default=1, help="tile the dataset N times")
+    parser.add_argument('--athlete-csv', default=datastore.ATHLETE_CSV, help="athlete events file to benchmark")
+    parser.add_argument('--only', nargs='+', help="only cases whose name starts with one of these")
+    parser.add_argument('--save-baseline', type=Path, help="write the results to this JSON file")
+    parser.add_argument('--compare', type=Path, help="compare against a saved baseline")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    report = run(scale=args.scale, only=args.only, athlete_csv=args.athlete_csv)
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        if baseline.get('scale') != report['scale']:
+            print(f"warning: baseline was recorded at scale {baseline.get('scale')}")
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Cold-start report for the Streamlit app: import time and first render per page.
+
+Each page is opened with ?page=<name> in a fresh interpreter (as on a new
+pod), rendered once with streamlit's AppTest, and reported with its
+first-render time, the plotting libraries it imported (cumulative import
+time from -X importtime) and the process's peak RSS. The snapshot is
+built beforehand, so the numbers exclude CSV parsing.
+
+Run from the project root:  python -m benchmarks.startup
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ['plotly.express', 'matplotlib.pyplot', 'seaborn']
+
+PROBE = """
+import json, resource, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600)
+at.query_params['page'] = sys.argv[2]
+start = time.perf_counter()
+at.run()
+print(json.dumps({
+    'render_ms': (time.perf_counter() - start) * 1e3,
+    'errors': [e.value for e in at.error] + [str(e) for e in at.exception],
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def import_times(stderr):
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1e3
+    return times
+
+
+def measure(app, page):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE, app, page],
+                            capture_output=True, text=True)
+    wall = (time.perf_counter() - start) * 1e3
+    if result.returncode:
+        raise RuntimeError(f"page {page} failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = import_times(result.stderr)
+    report['process_ms'] = wall
+    report['heavy_imports'] = {name: imports[name] for name in HEAVY_MODULES if name in imports}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and first render per app page")
+    parser.add_argument('--app', default='app.py')
+    parser.add_argument('--pages', nargs='+', default=['medals', 'overall', 'country', 'athlete'])
+    args = parser.parse_args()
+
+    import datastore
+    datastore.load_dataset()
+
+    print(f"{'page':10}{'process ms':>12}{'render ms':>12}{'peak RSS MB':>13}  plotting imports (cumulative ms)")
+    for page in args.pages:
+        report = measure(args.app, page)
+        heavy = ', '.join(f"{name} {ms:.0f}" for name, ms in report['heavy_imports'].items()) or '-'
+        print(f"{page:10}{report['process_ms']:12.0f}{report['render_ms']:12.0f}{report['max_rss_mb']:13.0f}  {heavy}")
+        for error in report['errors']:
+            print(f"  ERROR {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""Synthetic Olympic datasets for scale testing.
+
+fit() learns the shape of the real data: Games (Year/Season/City) mix,
+Sport per Games, Event per Sport, NOC and Team mix, women's share and
+medal rates per Sport, body measurements per Sex, the rate at which
+athletes reappear across rows, and the name tokens, plus the discipline
+and medal mix of the Tokyo athletes.csv/medals.csv files.
+
+generate() then streams any number of rows in the athlete_events schema
+to disk in chunks, and generate_edition() writes a matching
+athletes.csv/medals.csv pair for a new Games. Output is deterministic
+for a given profile and seed.
+
+    python -m benchmarks.synthetic --rows 27000000 --out synthetic/ --seed 7
+"""
+import argparse
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import datastore
+import ingest
+
+CHUNKSIZE = 200_000
+POOL_SIZE = 200_000
+MEDALS = np.array(['Gold', 'Silver', 'Bronze'], dtype=object)
+
+
+def distribution(series):
+    counts = series.value_counts(normalize=True)
+    return counts.index.to_numpy(dtype=object), counts.to_numpy()
+
+
+def fit(events_csv=datastore.ATHLETE_CSV, athletes_csv=ingest.TOKYO_2020['athletes'],
+        medals_csv=ingest.TOKYO_2020['medals']):
+    df = pd.read_csv(events_csv, low_memory=False)
+    games = df.groupby(['Games', 'Year', 'Season', 'City']).size()
+
+    tokens = df['Name'].drop_duplicates().str.split()
+    body = {}
+    for sex, group in df.groupby('Sex'):
+        body[sex] = {}
+        for col in ['Age', 'Height', 'Weight']:
+            values = pd.to_numeric(group[col], errors='coerce')
+            body[sex][col] = (values.mean(), values.std(), values.isna().mean(), values.min(), values.max())
+
+    medal_rows = df.dropna(subset=['Medal'])
+    athletes = pd.read_csv(athletes_csv)
+    medals = pd.read_csv(medals_csv)
+
+    return {
+        'games': (games.index.to_frame(index=False), games.to_numpy() / games.sum()),
+        'sport_by_games': {key: distribution(group['Sport']) for key, group in df.groupby('Games')},
+        'event_by_sport': {key: distribution(group['Event'].dropna()) for key, group in df.groupby('Sport')},
+        'noc': distribution(df['NOC']),
+        'team_by_noc': df.groupby('NOC')['Team'].agg(lambda teams: teams.mode().iat[0]).to_dict(),
+        'female_by_sport': (df['Sex'] == 'F').groupby(df['Sport']).mean().to_dict(),
+        'medal_by_sport': df['Medal'].notna().groupby(df['Sport']).mean().to_dict(),
+        'medal_mix': distribution(medal_rows['Medal'][medal_rows['Medal'].isin(MEDALS)]),
+        'body': body,
+        'new_athlete_rate': df['Name'].nunique() / len(df),
+        'first_names': distribution(tokens.str[0]),
+        'last_names': distribution(tokens.str[-1]),
+        'disciplines': distribution(athletes['discipline'].dropna()),
+        'edition_medal_rate': len(medals) / len(athletes),
+    }
+
+
+def sample(rng, choices, n):
+    values, p = choices
+    return values[rng.choice(len(values), size=n, p=p)]
+
+
+def make_names(rng, profile, n, tokyo_style=False):
+    first = sample(rng, profile['first_names'], n)
+    last = sample(rng, profile['last_names'], n)
+    if tokyo_style:
+        return [f"{surname.upper()} {given}" for given, surname in zip(first, last)]
+    return [f"{given} {surname}" for given, surname in zip(first, last)]
+
+
+def by_group(keys, table, rng, fallback):
+    """Sample one value per row from table[key] for each row's key"""
+    out = np.empty(len(keys), dtype=object)
+    for key in pd.unique(keys):
+        rows = np.flatnonzero(keys == key)
+        out[rows] = sample(rng, table.get(key, fallback), len(rows))
+    return out
+
+
+class AthletePool:
+    """Bounded ring of recent athletes, so reappearing names stay cheap to stream"""
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.filled = 0
+        self.cursor = 0
+        self.columns = {col: np.empty(size, dtype=object) for col in ['Name', 'Sex', 'NOC', 'Sport']}
+
+    def add(self, athletes):
+        count = len(athletes['Name'])
+        keep = min(count, self.size)
+        slots = (self.cursor + np.arange(count - keep, count)) % self.size
+        for col, values in self.columns.items():
+            values[slots] = np.asarray(athletes[col], dtype=object)[count - keep:]
+        self.cursor = (self.cursor + count) % self.size
+        self.filled = min(self.filled + count, self.size)
+
+    def pick(self, rng, n):
+        rows = rng.integers(0, self.filled, size=n)
+        return {col: values[rows] for col, values in self.columns.items()}
+
+
+def generate_chunk(rng, profile, pool, n, next_id):
+    games_table, games_p = profile['games']
+    games = games_table.iloc[rng.choice(len(games_table), size=n, p=games_p)].reset_index(drop=True)
+    games_keys = games['Games'].to_numpy(dtype=object)
+
+    new = rng.random(n) < profile['new_athlete_rate'] if pool.filled else np.ones(n, dtype=bool)
+    n_new = int(new.sum())
+    sport = by_group(games_keys[new], profile['sport_by_games'], rng, profile['disciplines'])
+    female_share = np.array([profile['female_by_sport'].get(s, 0.3) for s in sport])
+    athletes = {
+        'Name': make_names(rng, profile, n_new),
+        'Sex': np.where(rng.random(n_new) < female_share, 'F', 'M').astype(object),
+        'NOC': sample(rng, profile['noc'], n_new),
+        'Sport': sport,
+    }
+
+    rows = {col: np.empty(n, dtype=object) for col in athletes}
+    reused = pool.pick(rng, n - n_new) if n_new < n else None
+    for col in rows:
+        rows[col][new] = athletes[col]
+        if reused is not None:
+            rows[col][~new] = reused[col]
+    pool.add(athletes)
+
+    chunk = pd.DataFrame({'ID': np.arange(next_id, next_id + n), **rows})
+    for col in ['Age', 'Height', 'Weight']:
+        values = np.full(n, np.nan)
+        for sex, stats in profile['body'].items():
+            mean, std, missing, low, high = stats[col]
+            mask = chunk['Sex'].to_numpy() == sex
+            values[mask] = np.round(np.clip(rng.normal(mean, std, mask.sum()), low, high))
+            values[mask & (rng.random(n) < missing)] = np.nan
+        chunk[col] = values
+
+    chunk['Team'] = chunk['NOC'].map(profile['team_by_noc']).fillna(chunk['NOC'])
+    for col in ['Games', 'Year', 'Season', 'City']:
+        chunk[col] = games[col].to_numpy()
+    chunk['Event'] = by_group(chunk['Sport'].to_numpy(), profile['event_by_sport'], rng, (np.array([None]), [1.0]))
+
+    medal_rate = chunk['Sport'].map(profile['medal_by_sport']).fillna(0.15).to_numpy()
+    medalled = rng.random(n) < medal_rate
+    chunk['Medal'] = None
+    chunk.loc[medalled, 'Medal'] = sample(rng, profile['medal_mix'], int(medalled.sum()))
+    return chunk[ingest.COLUMNS]
+
+
+def generate(profile, rows, path, seed=0, chunksize=CHUNKSIZE):
+    """Stream `rows` synthetic rows in the athlete_events schema to path"""
+    rng = np.random.default_rng(seed)
+    pool = AthletePool()
+    written = 0
+    while written < rows:
+        n = min(chunksize, rows - written)
+        chunk = generate_chunk(rng, profile, pool, n, written + 1)
+        chunk.to_csv(path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += n
+    return written
+
+
+def generate_edition(profile, athletes, out_dir, seed=0, year=2024, city='Paris'):
+    """Write an athletes.csv/medals.csv pair in the Tokyo 2020 schema"""
+    rng = np.random.default_rng(seed)
+    out_dir = Path(out_dir)
+    names = make_names(rng, profile, athletes, tokyo_style=True)
+    noc = sample(rng, profile['noc'], athletes)
+    discipline = sample(rng, profile['disciplines'], athletes)
+    gender = np.where(rng.random(athletes) < 0.48, 'Female', 'Male')
+    height = rng.normal(1.76, 0.1, athletes)
+    feet, inches = np.divmod(np.round(height / 0.0254).astype(int), 12)
+
+    athletes_df = pd.DataFrame({
+        'name': names,
+        'gender': gender,
+        'country': [profile['team_by_noc'].get(code, code) for code in noc],
+        'country_code': noc,
+        'discipline': discipline,
+        'height_m/ft': [f"{m:.2f}/{ft}'{inch}''" for m, ft, inch in zip(height, feet, inches)],
+    })
+    athletes_df.to_csv(out_dir / f"athletes_{year}.csv", index=False)
+
+    winners = rng.choice(athletes, size=int(athletes * profile['edition_medal_rate']), replace=True)
+    medal_type = sample(rng, profile['medal_mix'], len(winners))
+    medals_df = pd.DataFrame({
+        'medal_type': [f"{medal} Medal" for medal in medal_type],
+        'athlete_name': athletes_df['name'].to_numpy()[winners],
+        'country_code': noc[winners],
+        'event': by_group(discipline[winners], profile['event_by_sport'], rng, (np.array(['Open']), [1.0])),
+        'discipline': discipline[winners],
+    })
+    medals_df.to_csv(out_dir / f"medals_{year}.csv", index=False)
+
+    return {
+        **ingest.TOKYO_2020,
+        'athletes': str(out_dir / f"athletes_{year}.csv"),
+        'medals': str(out_dir / f"medals_{year}.csv"),
+        'constants': {'Games': f"{year} Summer", 'Year': year, 'Season': 'Summer', 'City': city},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset fitted to the real one")
+    parser.add_argument('--rows', type=int, required=True, help="rows in the athlete_events file")
+    parser.add_argument('--out', type=Path, required=True, help="output directory")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--edition-athletes', type=int, default=0,
+                        help="also write an athletes/medals pair for a new edition")
+    parser.add_argument('--profile', type=Path, help="cache the fitted profile in this pickle file")
+    args = parser.parse_args()
+
+    if args.profile and args.profile.exists():
+        profile = pickle.loads(args.profile.read_bytes())
+    else:
+        profile = fit()
+        if args.profile:
+            args.profile.write_bytes(pickle.dumps(profile))
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    rows = generate(profile, args.rows, args.out / datastore.ATHLETE_CSV, seed=args.seed)
+    print(f" Wrote {rows:,} rows to {args.out / datastore.ATHLETE_CSV}")
+    if args.edition_athletes:
+        source = generate_edition(profile, args.edition_athletes, args.out, seed=args.seed)
+        print(f" Wrote {source['athletes']} and {source['medals']}")
+
+
+if __name__ == '__main__':
+    main()
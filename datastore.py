@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import helper
+import identity
+import preprocessor
+
+ATHLETE_CSV = "athlete_events_updated.csv"
+REGION_CSV = "noc_regions.csv"
+CACHE_DIR = Path(os.environ.get("OLYMPICS_CACHE_DIR", ".cache"))
+# bumped when derived columns change, so older snapshots and artifacts are rebuilt
+SCHEMA_VERSION = 7
+
+logger = logging.getLogger(__name__)
+
+
+# (path, size, mtime) of the inputs -> their content hash
+_hashes = {}
+
+
+def inputs_hash(paths):
+    """Content hash of the input files, used to key the snapshot; recomputed when one is modified"""
+    key = tuple((str(path), os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in paths)
+    if key not in _hashes:
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        _hashes[key] = digest.hexdigest()[:16]
+    return _hashes[key]
+
+
+def dataset_version(athlete_csv=ATHLETE_CSV, region_csv=REGION_CSV):
+    return f"{inputs_hash([athlete_csv, region_csv])}-{SCHEMA_VERSION}"
+
+
+def snapshot_path(key, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f"athletes-{key}.parquet"
+
+
+def remove(path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def write_snapshot(df, path):
+    """Write the snapshot as a directory with one Parquet file per Season/Year partition.
+
+    The directory is written under a temporary name and renamed into place,
+    so concurrent readers never see a partial snapshot.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    remove(tmp_path)
+    df.to_parquet(tmp_path, index=False, partition_cols=preprocessor.PARTITION_KEYS,
+                  basename_template="part-{i}.parquet")
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # another process has already written the same snapshot
+        remove(tmp_path)
+
+    # older snapshots belong to inputs that no longer exist
+    for stale in path.parent.glob("athletes-*.parquet"):
+        if stale != path:
+            remove(stale)
+
+
+def partition_filters(season=None, year=None):
+    """Parquet filters that prune the snapshot to one season and/or year"""
+    filters = []
+    if season is not None:
+        filters.append(('Season', '==', season))
+    if year is not None:
+        filters.append(('Year', '==', int(year)))
+    return filters or None
+
+
+def read_snapshot(path, columns=None, filters=None):
+    # files are read in partition order, which is the row order of the frame
+    return pd.read_parquet(path, columns=columns, filters=filters, memory_map=True)
+
+
+def snapshot_columns(path):
+    """Column order of the frame the snapshot was written from.
+
+    Reading moves the partition columns last; every file's pandas metadata
+    still lists the columns in their original order.
+    """
+    first = min(Path(path).rglob("*.parquet"))
+    return [col['name'] for col in pq.read_schema(first).pandas_metadata['columns']]
+
+
+def load_dataset(athlete_csv=ATHLETE_CSV, region_csv=REGION_CSV, cache_dir=CACHE_DIR):
+    """Return the preprocessed athlete frame and the region table.
+
+    The preprocessed frame is persisted as a Parquet snapshot keyed by the
+    content hash of the input CSVs, partitioned by Season and Year; it is
+    rebuilt whenever they change. Rows are ordered by the partitions.
+    The compact dtype schema from preprocessor.apply_schema is applied on
+    both paths, and each row carries the AthleteID from identity.py.
+    """
+    region_df = pd.read_csv(region_csv)
+    path = snapshot_path(dataset_version(athlete_csv, region_csv), cache_dir)
+
+    if path.exists():
+        df = read_snapshot(path)
+        return preprocessor.apply_schema(df[snapshot_columns(path)]), region_df
+
+    df = pd.read_csv(athlete_csv, low_memory=False)
+    df = preprocessor.preprocess(df, region_df).reset_index(drop=True)
+    before = preprocessor.memory_usage_mb(df)
+    df = preprocessor.apply_schema(df)
+    logger.info("athlete frame memory: %.1f MB -> %.1f MB", before, preprocessor.memory_usage_mb(df))
+    df['AthleteID'], _ = identity.resolve_athletes(df)
+
+    write_snapshot(df, path)
+    return df, region_df
+
+
+class ColumnStore:
+    """Columns of the snapshot, each read from Parquet the first time it is asked for.
+
+    frame(columns) returns a frame of just those columns. Every projection
+    has the rows of load_dataset() in the same order, so row positions are
+    interchangeable between them. frame(columns, season, year) prunes it
+    to those Season/Year partitions, a slice of the same rows. Frames are
+    shared and must not be modified in place. The snapshot is built first
+    when it does not exist.
+
+    With shared (a shared_dataset.SharedDataset), columns are taken
+    zero-copy from the memory-mapped generation instead, provided it was
+    published for the current CSVs; a stale generation is ignored with a
+    warning. published is the generation that was offered either way.
+    """
+
+    def __init__(self, athlete_csv=ATHLETE_CSV, region_csv=REGION_CSV, cache_dir=CACHE_DIR, shared=None):
+        self.published = shared.generation if shared is not None else None
+        if shared is not None and shared.version != dataset_version(athlete_csv, region_csv):
+            logger.warning("shared generation %s was published for dataset %s, not %s; reading the Parquet snapshot",
+                           shared.generation, shared.version, dataset_version(athlete_csv, region_csv))
+            shared = None
+        self.shared = shared
+        if shared is not None:
+            self.version = shared.version
+        else:
+            self.version = dataset_version(athlete_csv, region_csv)
+            self.path = snapshot_path(self.version, cache_dir)
+            if not self.path.exists():
+                load_dataset(athlete_csv, region_csv, cache_dir)
+        self.columns = {}
+        self.frames = {}
+        self.partitions = None
+        self.lock = threading.Lock()
+
+    def frame(self, columns, season=None, year=None):
+        columns = list(dict.fromkeys(columns))
+        key = tuple(columns)
+        with self.lock:
+            if key not in self.frames:
+                self.load(columns)
+                self.frames[key] = pd.DataFrame({col: self.columns[col] for col in columns}, copy=False)
+            frame = self.frames[key]
+            if season is None and year is None:
+                return frame
+            if self.partitions is None:
+                self.load(preprocessor.PARTITION_KEYS)
+                self.partitions = preprocessor.build_partitions(
+                    pd.DataFrame({col: self.columns[col] for col in preprocessor.PARTITION_KEYS}, copy=False))
+        return helper.take_partitions(frame, self.partitions, season, year)
+
+    def load(self, columns):
+        missing = [col for col in columns if col not in self.columns]
+        if missing:
+            if self.shared is not None:
+                loaded = self.shared.frame(missing)
+            else:
+                loaded = preprocessor.apply_schema(read_snapshot(self.path, columns=missing))
+            for col in missing:
+                self.columns[col] = loaded[col]
+
+    def stats(self):
+        with self.lock:
+            return {
+                'columns': sorted(self.columns),
+                'memory_mb': round(sum(col.memory_usage(deep=True) for col in self.columns.values()) / 2 ** 20, 1),
+                # the same columns in their read_csv dtypes, i.e. what the compact schema saves
+                'raw_memory_mb': round(preprocessor.raw_memory_usage_mb(self.columns.values()), 1),
+                'projections': len(self.frames),
+                'partitions': len(self.partitions) if self.partitions is not None else None,
+                'shared_generation': self.shared.generation if self.shared is not None else None,
+            }
+
+
+def load_columns(columns, season=None, year=None, athlete_csv=ATHLETE_CSV, region_csv=REGION_CSV,
+                 cache_dir=CACHE_DIR):
+    """Return only `columns` of the preprocessed frame, read from the snapshot.
+
+    With season and/or year, only the files of those partitions are read.
+    """
+    if season is None and year is None:
+        return ColumnStore(athlete_csv, region_csv, cache_dir).frame(columns)
+    path = ColumnStore(athlete_csv, region_csv, cache_dir).path
+    df = read_snapshot(path, columns=list(columns), filters=partition_filters(season, year))
+    return preprocessor.apply_schema(df).reset_index(drop=True)
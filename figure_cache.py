@@ -0,0 +1,217 @@
+"""Disk cache of rendered chart images.
+
+Annotated seaborn heatmaps cost hundreds of milliseconds to draw, so the
+PNG bytes are cached on disk keyed by (view, parameters, dataset
+version). The directory is bounded in size: the least recently used
+files are evicted first. Running this module prerenders every figure in
+a process pool:
+
+    python figure_cache.py [--workers N]
+
+matplotlib and seaborn are imported on the first render, so serving a
+cached image does not pay for them.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+FIGURE_DIR = Path(os.environ.get("OLYMPICS_FIGURE_DIR", ".cache/figures"))
+MAX_BYTES = int(os.environ.get("OLYMPICS_FIGURE_CACHE_MB", 256)) * 2 ** 20
+
+
+class FigureCache:
+    def __init__(self, directory=FIGURE_DIR, max_bytes=MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def path(self, view, params, version):
+        key = json.dumps([view, params, version], sort_keys=True, default=str)
+        return self.directory / f"{view}-{hashlib.sha1(key.encode()).hexdigest()[:20]}.png"
+
+    def get(self, view, params, version):
+        path = self.path(view, params, version)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        os.utime(path)  # mtime doubles as the LRU clock
+        return data
+
+    def put(self, view, params, version, data):
+        path = self.path(view, params, version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_or_render(self, view, params, version, render):
+        data = self.get(view, params, version)
+        if data is None:
+            data = render()
+            self.put(view, params, version, data)
+        return data
+
+    def evict(self):
+        files = []
+        for path in self.directory.glob("*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def to_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    pyplot().close(fig)
+    return buffer.getvalue()
+
+
+def render_event_heatmap(pivot_data):
+    import seaborn as sns
+
+    fig, ax = pyplot().subplots(figsize=(16, 12))
+    sns.heatmap(
+        pivot_data,
+        annot=True,
+        fmt='d',
+        linewidths=0.5,
+        cmap="YlGnBu",
+        cbar_kws={'label': 'Number of Events'},
+        ax=ax
+    )
+    ax.set_title("Event Distribution by Sport and Year", fontsize=16, pad=20)
+    ax.set_xlabel("Year", fontsize=12)
+    ax.set_ylabel("Sport", fontsize=12)
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.tick_params(axis='y', labelrotation=0)
+    return to_png(fig)
+
+
+def render_country_heatmap(heatmap_data, country):
+    import seaborn as sns
+
+    fig, ax = pyplot().subplots(figsize=(16, 10))
+    sns.heatmap(
+        heatmap_data,
+        annot=True,
+        fmt='g',
+        cmap="crest",
+        cbar_kws={'label': 'Number of Medals'},
+        ax=ax
+    )
+    ax.set_title(f"{country}'s Medal Performance by Sport and Year", fontsize=14, pad=20)
+    ax.set_xlabel("Year", fontsize=12)
+    ax.set_ylabel("Sport", fontsize=12)
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.tick_params(axis='y', labelrotation=0)
+    return to_png(fig)
+
+
+def render_medal_trend(country_df, country):
+    fig, ax = pyplot().subplots(figsize=(12, 4))
+    ax.plot(country_df['Year'], country_df['Medal'], marker='o', color='#FFD700', linewidth=3)
+    ax.set_title(f"{country}'s Medal Count Over Years", fontsize=14)
+    ax.set_xlabel("Year", fontsize=12)
+    ax.set_ylabel("Number of Medals", fontsize=12)
+    ax.grid(alpha=0.3)
+    return to_png(fig)
+
+
+def render_body_metrics(athlete_df, points, sport):
+    """Height/weight scatter of points; when points is a sample, over a hexbin of every athlete"""
+    import seaborn as sns
+
+    plt = pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    title = f"Height vs Weight Distribution ({sport})"
+    if len(points) < len(athlete_df):
+        ax.hexbin(athlete_df['Weight'], athlete_df['Height'], gridsize=60, bins='log', mincnt=1, cmap='Greys', alpha=0.5)
+        title += f", {len(points):,} of {len(athlete_df):,} athletes drawn"
+    sns.scatterplot(
+        data=points,
+        x='Weight',
+        y='Height',
+        hue='Medal',
+        style='Sex',
+        s=60,
+        ax=ax,
+        palette={'Gold': '#FFD700', 'Silver': '#C0C0C0', 'Bronze': '#CD7F32', 'No Medal': '#808080'}
+    )
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel("Weight (kg)", fontsize=12)
+    ax.set_ylabel("Height (cm)", fontsize=12)
+    ax.legend(title='Medal / Gender', bbox_to_anchor=(1.05, 1), loc='upper left')
+    return to_png(fig)
+
+
+def prerender_country(version, season, country, directory, max_bytes):
+    import helper
+    import precompute
+
+    ctx = precompute.load_context(season)
+    start = time.perf_counter()
+    heatmap_data = helper.country_event_heatmap(ctx['df'], country, medal_events=ctx['medal_events'])
+    if not heatmap_data.empty:
+        FigureCache(directory, max_bytes).get_or_render(
+            'country_heatmap', {'country': country, 'season': season}, version,
+            lambda: render_country_heatmap(heatmap_data, country)
+        )
+    return time.perf_counter() - start
+
+
+def warm_up(workers=None, directory=FIGURE_DIR, max_bytes=MAX_BYTES):
+    """Prerender the Overall event heatmap and every country heatmap of each season"""
+    import datastore
+    import helper
+    import precompute
+    import preprocessor
+
+    version = datastore.dataset_version()
+    cache = FigureCache(directory, max_bytes)
+    tasks = []
+    for season in preprocessor.SEASONS:
+        ctx = precompute.load_context(season)
+        cache.get_or_render('event_heatmap', {'season': season}, version,
+                            lambda: render_event_heatmap(helper.event_heatmap(ctx['df'])))
+        tasks += [(season, country) for country in sorted(ctx['df']['region'].dropna().unique().tolist())]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=precompute.load_contexts) as pool:
+        futures = [pool.submit(prerender_country, version, season, country, directory, max_bytes)
+                   for season, country in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            future.result()
+            if done % 50 == 0 or done == len(futures):
+                print(f" {done}/{len(futures)} country heatmaps", flush=True)
+    return len(tasks), time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Prerender the heatmap figures")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    count, seconds = warm_up(workers=args.workers)
+    print(f" Prerendered {count} country heatmaps in {seconds:.1f}s")
@@ -1,14 +1,38 @@
 import numpy as np
+import pandas as pd
 
-def fetch_medal_tally(df, year, country):
-    temp_df = df.dropna(subset=['Medal'])
 
-    if year != "Overall":
-        temp_df = temp_df[temp_df['Year'] == int(year)]
-    if country != "Overall":
-        temp_df = temp_df[temp_df['region'] == country]
+def uses(columns, **fast_paths):
+    # declares the df columns a helper reads: a tuple, or a function of its other arguments.
+    # fast_paths name keyword arguments (precomputed structures) that need other columns instead
+    def declare(func):
+        func.columns = columns
+        func.fast_paths = fast_paths
+        return func
+    return declare
+
+
+def columns_for(func, *args, **kwargs):
+    """Columns of df that func(df, *args, **kwargs) reads"""
+    for name, columns in func.fast_paths.items():
+        if kwargs.get(name) is not None:
+            return columns
+    return tuple(func.columns(*args)) if callable(func.columns) else func.columns
+
+
+@uses(('Medal', 'Year', 'region'), cube=())
+def fetch_medal_tally(df, year, country, cube=None):
+    if cube is not None:
+        medal_tally = slice_medal_cube(cube, year, country)
+    else:
+        temp_df = df.dropna(subset=['Medal'])
 
-    medal_tally = temp_df.groupby(['region', 'Medal']).size().unstack(fill_value=0)
+        if year != "Overall":
+            temp_df = temp_df[temp_df['Year'] == int(year)]
+        if country != "Overall":
+            temp_df = temp_df[temp_df['region'] == country]
+
+        medal_tally = temp_df.groupby(['region', 'Medal'], observed=True).size().unstack(fill_value=0)
 
     for col in ['Gold', 'Silver', 'Bronze']:
         if col not in medal_tally.columns:
@@ -20,6 +44,51 @@ def fetch_medal_tally(df, year, country):
     return medal_tally.astype({'Gold': 'int', 'Silver': 'int', 'Bronze': 'int', 'total': 'int'})
 
 
+def slice_medal_cube(cube, year, country):
+    # cube comes from preprocessor.build_medal_cube
+    if year != "Overall":
+        cube = cube[cube.index.get_level_values('Year') == int(year)]
+    if country != "Overall":
+        cube = cube[cube.index.get_level_values('region') == country]
+
+    return cube.groupby(level='region').sum()
+
+
+def take_rows(df, row_index, col, value):
+    # row_index comes from preprocessor.build_row_index; same rows as df[df[col] == value],
+    # followed by the matching rows appended since (live.py keeps those apart from df)
+    lookup, order, offsets, appended = row_index[col]
+    code = lookup.get(value)
+    rows = df.iloc[0:0] if code is None else df.take(order[offsets[code]:offsets[code + 1]])
+    if appended is not None:
+        more = take_rows(*appended, col, value)
+        if len(more):
+            rows = pd.concat([rows, more])
+    return rows
+
+
+def take_partitions(df, partitions, season=None, year=None):
+    # partitions comes from preprocessor.build_partitions; same rows as filtering df on Season and Year,
+    # but only the selected partitions' rows are touched
+    if season is not None and year is not None:
+        if (season, int(year)) not in partitions.index:
+            return df.iloc[0:0]
+        start, stop = partitions.to_numpy()[partitions.index.get_loc((season, int(year)))]
+        return df.iloc[start:stop]
+    selected = partitions
+    if season is not None:
+        selected = selected[selected.index.get_level_values('Season') == season]
+    if year is not None:
+        selected = selected[selected.index.get_level_values('Year') == int(year)]
+    if selected.empty:
+        return df.iloc[0:0]
+    starts, stops = selected['start'].to_numpy(), selected['stop'].to_numpy()
+    if (starts[1:] == stops[:-1]).all():
+        return df.iloc[starts[0]:stops[-1]]
+    return df.take(np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)]))
+
+
+@uses(('Year', 'region'))
 def country_year_list(df):
     years = df['Year'].unique().tolist()
     years.sort()
@@ -32,77 +101,185 @@ def country_year_list(df):
     return years, country
 
 
-def data_over_time(df, col):
+@uses(lambda col: ('Year', col), trends=())
+def data_over_time(df, col, trends=None):
+    if trends is not None:
+        # trends comes from preprocessor.build_trends; one count per Year, already sorted
+        counts = trends[col]
+        return pd.DataFrame({'Edition': counts.index.to_numpy(), col: counts.to_numpy()})
+
     nations_over_time = df.drop_duplicates(['Year', col])['Year'].value_counts().reset_index()
     nations_over_time.columns = ['Edition', col]
-    nations_over_time = nations_over_time.sort_values('Edition')
+    nations_over_time = nations_over_time.sort_values('Edition').reset_index(drop=True)
     return nations_over_time
 
 
-def most_successful(df, sport):
-    temp_df = df.dropna(subset=['Medal'])
+def plain_strings(frame):
+    # categorical columns as their values' dtype: a short table should not carry every category along
+    return frame.astype({col: frame[col].cat.categories.dtype for col in frame.columns
+                         if isinstance(frame[col].dtype, pd.CategoricalDtype)})
 
-    if sport != 'Overall':
-        temp_df = temp_df[temp_df['Sport'] == sport]
 
-    top_athletes = temp_df['Name'].value_counts().reset_index().head(15)
-    top_athletes.columns = ['Name', 'Medals']
+def rank_athletes(ranking, scope, key, n):
+    # ranking comes from preprocessor.build_athlete_ranking; same order as value_counts().head(n)
+    ids, medals, first = ranking[scope].get(key, ([], np.array([], dtype=int), np.array([], dtype=int)))
+    order_key = first - medals.astype(np.int64) * ranking['size']
+    if len(order_key) > n:
+        top = np.argpartition(order_key, n - 1)[:n]
+    else:
+        top = np.arange(len(order_key))
+    top = top[np.argsort(order_key[top])]
+
+    result = plain_strings(ranking['attributes'].loc[np.asarray(ids)[top]].reset_index(drop=True))
+    result.insert(1, 'Medals', medals[top].astype(np.int64))
+    return result
+
 
-    merged_df = top_athletes.merge(df, on='Name', how='left')[['Name', 'Medals', 'Sport', 'region']]
-    merged_df = merged_df.drop_duplicates('Name')
+@uses(('AthleteID', 'Name', 'Medal', 'Sport', 'region'), ranking=())
+def most_successful(df, sport, row_index=None, ranking=None):
+    if ranking is not None:
+        return rank_athletes(ranking, 'Sport' if sport != 'Overall' else 'Overall', sport, 15)
 
-    return merged_df
+    if sport != 'Overall' and row_index is not None:
+        temp_df = take_rows(df, row_index, 'Sport', sport).dropna(subset=['Medal'])
+    else:
+        temp_df = df.dropna(subset=['Medal'])
 
+        if sport != 'Overall':
+            temp_df = temp_df[temp_df['Sport'] == sport]
 
-def yearwise_medal_tally(df, country):
-    temp_df = df.dropna(subset=['Medal'])
-    temp_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'], inplace=True)
+    top_athletes = temp_df['AthleteID'].value_counts().reset_index().head(15)
+    top_athletes.columns = ['AthleteID', 'Medals']
+
+    merged_df = top_athletes.merge(df, on='AthleteID', how='left')[['AthleteID', 'Name', 'Medals', 'Sport', 'region']]
+    merged_df = merged_df.drop_duplicates('AthleteID').drop(columns='AthleteID').reset_index(drop=True)
+
+    return plain_strings(merged_df)
+
+
+def region_medal_events(medal_events, country):
+    # medal_events comes from preprocessor.build_medal_events
+    if country in medal_events.index:
+        return medal_events.loc[[country]]
+    return medal_events.iloc[0:0]
+
+
+@uses(('Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal', 'region'), medal_events=())
+def yearwise_medal_tally(df, country, medal_events=None):
+    if medal_events is not None:
+        new_df = region_medal_events(medal_events, country)
+    else:
+        temp_df = df.dropna(subset=['Medal'])
+        temp_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'], inplace=True)
+        new_df = temp_df[temp_df['region'] == country]
 
-    new_df = temp_df[temp_df['region'] == country]
     final_df = new_df.groupby('Year').count()['Medal'].reset_index()
 
     return final_df
 
 
-def country_event_heatmap(df, country):
-    temp_df = df.dropna(subset=['Medal'])
-    temp_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'], inplace=True)
-
-    new_df = temp_df[temp_df['region'] == country]
+@uses(('Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal', 'region'), medal_events=())
+def country_event_heatmap(df, country, medal_events=None):
+    if medal_events is not None:
+        new_df = region_medal_events(medal_events, country)
+    else:
+        temp_df = df.dropna(subset=['Medal'])
+        temp_df.drop_duplicates(subset=['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal'], inplace=True)
+        new_df = temp_df[temp_df['region'] == country]
 
-    pt = new_df.pivot_table(index='Sport', columns='Year', values='Medal', aggfunc='count').fillna(0)
+    pt = new_df.pivot_table(index='Sport', columns='Year', values='Medal', aggfunc='count', observed=True).fillna(0)
     return pt
 
 
-def most_successful_countrywise(df, country):
-    temp_df = df.dropna(subset=['Medal'])
-    temp_df = temp_df[temp_df['region'] == country]
+@uses(('AthleteID', 'Name', 'Medal', 'Sport', 'region'), ranking=())
+def most_successful_countrywise(df, country, row_index=None, ranking=None):
+    if ranking is not None:
+        return rank_athletes(ranking, 'region', country, 10).drop(columns='region')
 
-    top_athletes = temp_df['Name'].value_counts().reset_index().head(10)
-    top_athletes.columns = ['Name', 'Medals']
+    if row_index is not None:
+        temp_df = take_rows(df, row_index, 'region', country).dropna(subset=['Medal'])
+    else:
+        temp_df = df.dropna(subset=['Medal'])
+        temp_df = temp_df[temp_df['region'] == country]
+
+    top_athletes = temp_df['AthleteID'].value_counts().reset_index().head(10)
+    top_athletes.columns = ['AthleteID', 'Medals']
+
+    merged_df = top_athletes.merge(df, on='AthleteID', how='left')[['AthleteID', 'Name', 'Medals', 'Sport']]
+    merged_df = merged_df.drop_duplicates('AthleteID').drop(columns='AthleteID').reset_index(drop=True)
 
-    merged_df = top_athletes.merge(df, on='Name', how='left')[['Name', 'Medals', 'Sport']]
-    merged_df = merged_df.drop_duplicates('Name')
+    return plain_strings(merged_df)
 
-    return merged_df
 
+@uses(('AthleteID', 'region', 'Medal', 'Sport', 'Sex', 'Height', 'Weight'), body_metrics=())
+def weight_v_height(df, sport, body_metrics=None):
+    # body_metrics comes from preprocessor.build_body_metrics; athletes with both Height and Weight
+    if body_metrics is not None:
+        athlete_df = body_metrics
+    else:
+        athlete_df = df.drop_duplicates(subset=['AthleteID', 'region']).dropna(subset=['Height', 'Weight'])
+        athlete_df = athlete_df.assign(Medal=athlete_df['Medal'].astype(object).fillna('No Medal'))
+        athlete_df = athlete_df[['AthleteID', 'Sex', 'Sport', 'Height', 'Weight', 'Medal']].reset_index(drop=True)
 
-def weight_v_height(df, sport):
-    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
-    athlete_df['Medal'].fillna('No Medal', inplace=True)
     if sport != 'Overall':
         return athlete_df[athlete_df['Sport'] == sport]
     return athlete_df
 
 
-def men_vs_women(df):
-    athlete_df = df.drop_duplicates(subset=['Name', 'region'])
-
-    men = athlete_df[athlete_df['Sex'] == 'M'].groupby('Year').count()['Name'].reset_index()
-    women = athlete_df[athlete_df['Sex'] == 'F'].groupby('Year').count()['Name'].reset_index()
+def sample_body_metrics(athlete_df, max_points=5000, seed=0):
+    # at most max_points rows: every medalist, then an equal share of the others of each Sex.
+    # When the medalists alone are too many, an equal share of each medal is kept instead.
+    if len(athlete_df) <= max_points:
+        return athlete_df
+    medalled = athlete_df['Medal'] != 'No Medal'
+    medalists = athlete_df[medalled]
+    if len(medalists) >= max_points:
+        return medalists.groupby('Medal').sample(frac=max_points / len(medalists), random_state=seed).sort_index()
+
+    others = athlete_df[~medalled]
+    share = (max_points - len(medalists)) / len(others)
+    sampled = others.groupby('Sex', dropna=False, observed=True).sample(frac=share, random_state=seed)
+    return pd.concat([medalists, sampled]).sort_index()
+
+
+@uses(('AthleteID', 'Sex', 'Year'), trends=())
+def men_vs_women(df, trends=None):
+    # distinct athletes of each sex at every edition
+    if trends is not None:
+        final = pd.DataFrame({'Male': trends['Male'], 'Female': trends['Female']})
+    else:
+        athlete_df = df.drop_duplicates(subset=['Year', 'Sex', 'AthleteID'])
+        final = athlete_df.groupby(['Year', 'Sex'], observed=True).size().unstack(fill_value=0)
+        final = final.reindex(columns=['M', 'F'], fill_value=0).rename(columns={'M': 'Male', 'F': 'Female'})
+
+    final = final[final['Male'] > 0].astype(int).rename_axis(columns=None).reset_index()
+    return final
 
-    final = men.merge(women, on='Year', how='left')
-    final.rename(columns={'Name_x': 'Male', 'Name_y': 'Female'}, inplace=True)
-    final.fillna(0, inplace=True)
 
-    return final
+@uses(('Year', 'Sport', 'Event'))
+def event_heatmap(df):
+    event_df = df.drop_duplicates(['Year', 'Sport', 'Event'])
+    pt = event_df.pivot_table(index='Sport', columns='Year', values='Event', aggfunc='count', observed=True)
+    return pt.fillna(0).astype(int)
+
+
+@uses(('AthleteID', 'Name', 'Medal', 'Year', 'City', 'Sport', 'Event'))
+def athlete_profile(df, athlete_id, row_index=None):
+    if row_index is not None:
+        athlete_data = take_rows(df, row_index, 'AthleteID', athlete_id)
+    else:
+        athlete_data = df[df['AthleteID'] == athlete_id]
+
+    medal_wins = athlete_data[athlete_data['Medal'].notnull()]
+    medal_count = medal_wins['Medal'].value_counts()
+    medal_table = medal_wins[['Year', 'City', 'Sport', 'Event', 'Medal']].drop_duplicates().sort_values(by='Year')
+
+    return {
+        'athlete_id': athlete_id,
+        'names': athlete_data['Name'].dropna().unique().tolist(),
+        'years': sorted(int(year) for year in athlete_data['Year'].unique()),
+        'sports': sorted(athlete_data['Sport'].dropna().unique().tolist()),
+        'medals': {medal: int(medal_count.get(medal, 0)) for medal in ['Gold', 'Silver', 'Bronze']},
+        'total_medals': int(medal_wins.shape[0]),
+        'medal_table': medal_table.reset_index(drop=True),
+    }
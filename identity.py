@@ -0,0 +1,149 @@
+"""Athlete entity resolution.
+
+Rows from the historic dataset carry the source athlete ID, which is
+trusted: rows sharing it are one person, and different IDs are different
+people even when the names are equal. Rows appended by ingest.py have no
+ID (and Tokyo-style 'SURNAME Given' names), so they are grouped into
+records by (normalized name, Sex, NOC) and linked to a historic athlete
+when the evidence agrees:
+
+    candidates   same Sex and NOC, sharing a name token (the blocking key)
+    name         one name's tokens contain the other's; equal names score higher
+    sport        shared Sport
+    birth year   Year - Age within a year when both are known; further apart rejects
+    career       last historic Games at most CAREER_YEARS before the new one
+
+The best candidate above LINK_SCORE wins; a tie between two historic
+athletes leaves the record unlinked. Every person then gets a compact
+integer AthleteID, ordered by source ID.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+logger = logging.getLogger(__name__)
+
+LINK_SCORE = 3
+CAREER_YEARS = 24
+
+
+def tokens(records):
+    # one row per distinct name token of each record, indexed by record position
+    exploded = records['key'].str.split().explode().dropna()
+    return exploded.rename('token').rename_axis('record').reset_index().drop_duplicates()
+
+
+def source_records(rows):
+    """One record per athlete: rows grouped on the source ID, or on (key, Sex, NOC) when there is none.
+
+    Returns the records, each row's record position and the distinct (record, Sport) pairs.
+    """
+    has_id = rows['source'].notna().to_numpy()
+    record_of_row = np.empty(len(rows), dtype=np.int64)
+    known_codes, known = pd.factorize(rows.loc[has_id, 'source'])
+    record_of_row[has_id] = known_codes
+    record_of_row[~has_id] = len(known) + rows[~has_id].groupby(['key', 'Sex', 'NOC'], sort=False).ngroup()
+
+    records = rows.groupby(record_of_row).agg(
+        key=('key', 'first'),
+        Sex=('Sex', 'first'),
+        NOC=('NOC', 'first'),
+        source=('source', 'first'),
+        born=('born', 'median'),
+        first_year=('Year', 'min'),
+        last_year=('Year', 'max'),
+    )
+    sports = pd.DataFrame({'record': record_of_row, 'Sport': rows['Sport'].to_numpy()}).dropna().drop_duplicates()
+    return records, record_of_row, sports
+
+
+def link_records(loose, known, loose_sports, known_sports):
+    """Historic record position for each loose record, or -1; plus the count left ambiguous"""
+    loose_tokens = tokens(loose)
+    known_tokens = tokens(known)
+    loose_tokens = loose_tokens.join(loose[['Sex', 'NOC']], on='record')
+    known_tokens = known_tokens.join(known[['Sex', 'NOC']], on='record')
+
+    pairs = loose_tokens.merge(known_tokens, on=['Sex', 'NOC', 'token'], suffixes=('_loose', '_known'))
+    pairs = pairs.groupby(['record_loose', 'record_known']).size().rename('shared').reset_index()
+    links = np.full(len(loose), -1)
+    if pairs.empty:
+        return links, 0
+
+    left = loose.iloc[pairs['record_loose'].to_numpy()].reset_index(drop=True)
+    right = known.iloc[pairs['record_known'].to_numpy()].reset_index(drop=True)
+    left_size = left['key'].str.split().str.len()
+    right_size = right['key'].str.split().str.len()
+
+    contained = pairs['shared'] == np.minimum(left_size, right_size)
+    score = np.where(left['key'] == right['key'], 2, 1)
+    shared_sport = (pairs[['record_loose', 'record_known']]
+                    .merge(loose_sports.rename(columns={'record': 'record_loose'}), on='record_loose')
+                    .merge(known_sports.rename(columns={'record': 'record_known'}), on=['record_known', 'Sport'])
+                    [['record_loose', 'record_known']].drop_duplicates())
+    score += 2 * pd.MultiIndex.from_frame(pairs[['record_loose', 'record_known']]).isin(
+        pd.MultiIndex.from_frame(shared_sport))
+    born_gap = (left['born'] - right['born']).abs()
+    score += (born_gap <= 1).to_numpy()
+    score += (left['first_year'] - right['last_year'] <= CAREER_YEARS).to_numpy()
+
+    plausible = contained & ~(born_gap > 1) & (right['first_year'] <= left['last_year'])
+    pairs = pairs.assign(score=score)[plausible & (score >= LINK_SCORE)]
+
+    best = pairs.groupby('record_loose')['score'].transform('max')
+    pairs = pairs[pairs['score'] == best]
+    ties = pairs['record_loose'].duplicated(keep=False)
+    chosen = pairs[~ties]
+    links[chosen['record_loose'].to_numpy()] = chosen['record_known'].to_numpy()
+    return links, int(pairs.loc[ties, 'record_loose'].nunique())
+
+
+def resolve_athletes(df):
+    """Integer AthleteID for each row of df; returns (ids, report)"""
+    names = df['Name'].astype(object)
+    unique_names = pd.unique(names.dropna())
+    keys = pd.Series(ingest.normalize_names(pd.Series(unique_names, dtype=object)).to_numpy(), index=unique_names)
+    source = pd.to_numeric(df['ID'], errors='coerce') if 'ID' in df.columns else pd.Series(np.nan, index=df.index)
+    age = pd.to_numeric(df['Age'], errors='coerce') if 'Age' in df.columns else np.nan
+
+    rows = pd.DataFrame({
+        'key': names.map(keys).fillna('').to_numpy(dtype=object),
+        'Sex': df['Sex'].astype(object).fillna('').to_numpy(),
+        'NOC': df['NOC'].astype(object).fillna('').to_numpy(),
+        'Sport': df['Sport'].astype(object).to_numpy(),
+        'source': source.to_numpy(dtype=float),
+        'born': (df['Year'].astype(float) - age).to_numpy(dtype=float),
+        'Year': df['Year'].to_numpy(),
+    })
+    records, record_of_row, sports = source_records(rows)
+
+    is_known = records['source'].notna().to_numpy()
+    known = records[is_known].reset_index(drop=True)
+    loose = records[~is_known].reset_index(drop=True)
+    if len(loose) and len(known):
+        # known records come first, so loose record numbers are shifted to loose positions
+        is_loose = sports['record'] >= len(known)
+        loose_sports = sports[is_loose].assign(record=sports['record'][is_loose] - len(known))
+        links, ambiguous = link_records(loose, known, loose_sports, sports[~is_loose])
+    else:
+        links, ambiguous = np.full(len(loose), -1), 0
+
+    # person per record: the source ID, a linked source ID, or a new number after the largest one
+    next_id = np.nanmax(known['source']) + 1 if len(known) else 0
+    person = np.empty(len(records))
+    person[is_known] = known['source'].to_numpy()
+    person[~is_known] = np.where(links >= 0, known['source'].to_numpy()[np.maximum(links, 0)],
+                                 next_id + np.arange(len(loose)))
+    codes, _ = pd.factorize(person[record_of_row], sort=True)
+
+    report = {
+        'athletes': int(codes.max()) + 1 if len(codes) else 0,
+        'records_without_id': len(loose),
+        'linked': int((links >= 0).sum()),
+        'ambiguous': ambiguous,
+    }
+    logger.info("athlete resolution: %s", report)
+    return codes.astype(np.int32), report
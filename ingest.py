@@ -0,0 +1,284 @@
+"""Ingestion of Olympic results into athlete_events_updated.csv.
+
+The historic athlete_events.csv is streamed once, in chunks, into
+athlete_events_updated.csv. Later editions are described by a source
+spec (see TOKYO_2020), normalized onto the same schema and appended to
+the CSV. The Games already in the CSV are listed in a small manifest
+next to it (athlete_events_updated.games.json), so skipping them does
+not read the CSV; it is rebuilt from the Games column when the CSV was
+changed by anything else. Replacing an edition rewrites the whole CSV.
+
+Appending is not incremental downstream: any change to the CSV changes
+its content hash, so the next datastore.load_dataset() reparses the
+whole CSV, preprocesses it, resolves AthleteIDs across every edition
+(identity.py links new athletes against all of history) and rewrites
+every Season/Year partition of the snapshot.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HISTORY_CSV = "athlete_events.csv"
+UPDATED_CSV = "athlete_events_updated.csv"
+CHUNKSIZE = 50_000
+# parsed heights outside this range are data-entry errors
+HEIGHT_RANGE_CM = (100, 250)
+
+logger = logging.getLogger(__name__)
+
+# athlete_events.csv schema, in file order
+COLUMNS = ['ID', 'Name', 'Sex', 'Age', 'Height', 'Weight', 'Team', 'NOC',
+           'Games', 'Year', 'Season', 'City', 'Sport', 'Event', 'Medal']
+DTYPES = {
+    'ID': 'float64', 'Age': 'float64', 'Height': 'float64', 'Weight': 'float64', 'Year': 'int64',
+    'Name': 'object', 'Sex': 'object', 'Team': 'object', 'NOC': 'object', 'Games': 'object',
+    'Season': 'object', 'City': 'object', 'Sport': 'object', 'Event': 'object', 'Medal': 'object',
+}
+
+TOKYO_2020 = {
+    'athletes': "athletes.csv",
+    'medals': "medals.csv",
+    'athlete_columns': {
+        'name': 'Name',
+        'country_code': 'NOC',
+        'discipline': 'Sport',
+        'gender': 'Sex',
+        'height_m/ft': 'Height',
+        'country': 'Team',
+        'birth_date': 'BirthDate',
+    },
+    'medal_columns': {
+        'athlete_name': 'Name',
+        'medal_type': 'Medal',
+        'country_code': 'NOC',
+        'discipline': 'Sport',
+        'event': 'Event',
+    },
+    # source values mapped onto the athlete_events vocabulary
+    'values': {
+        'Sex': {'Male': 'M', 'Female': 'F'},
+        'Medal': {'Gold Medal': 'Gold', 'Silver Medal': 'Silver', 'Bronze Medal': 'Bronze'},
+    },
+    'constants': {'Games': '2020 Summer', 'Year': 2020, 'Season': 'Summer', 'City': 'Tokyo'},
+    # Age is derived from BirthDate as of the opening day (held in 2021)
+    'age_on': '2021-07-23',
+}
+
+
+def stream_history(path=HISTORY_CSV, chunksize=CHUNKSIZE):
+    return pd.read_csv(path, usecols=COLUMNS, dtype=DTYPES, chunksize=chunksize)
+
+
+def write_chunks(chunks, csv_path):
+    """Write chunks to csv_path under a temporary name, then rename it into place; returns the rows written"""
+    tmp_path = Path(csv_path).with_name(f".{Path(csv_path).name}.{os.getpid()}.tmp")
+    rows = 0
+    try:
+        pd.DataFrame(columns=COLUMNS).to_csv(tmp_path, index=False)
+        for chunk in chunks:
+            chunk[COLUMNS].to_csv(tmp_path, mode='a', header=False, index=False)
+            rows += len(chunk)
+        os.replace(tmp_path, csv_path)
+    finally:
+        Path(tmp_path).unlink(missing_ok=True)
+    return rows
+
+
+def build_history(history_csv=HISTORY_CSV, csv_path=UPDATED_CSV, chunksize=CHUNKSIZE):
+    """Stream the historic results into a fresh updated CSV"""
+    games = set()
+
+    def chunks():
+        for chunk in stream_history(history_csv, chunksize):
+            games.update(chunk['Games'].dropna().unique())
+            yield chunk
+
+    rows = write_chunks(chunks(), csv_path)
+    write_manifest(csv_path, games)
+    return rows
+
+
+def manifest_path(csv_path):
+    return Path(csv_path).with_suffix(".games.json")
+
+
+def csv_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_manifest(csv_path, games):
+    """Record the Games in csv_path along with its current size and mtime"""
+    path = manifest_path(csv_path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({'csv': csv_stamp(csv_path), 'games': sorted(games)}))
+    os.replace(tmp_path, path)
+
+
+def ingested_games(csv_path=UPDATED_CSV, chunksize=CHUNKSIZE):
+    """Games already in the updated CSV: from its manifest, or its Games column when that is stale"""
+    if not os.path.exists(csv_path):
+        return set()
+    try:
+        manifest = json.loads(manifest_path(csv_path).read_text())
+        if manifest['csv'] == csv_stamp(csv_path):
+            return set(manifest['games'])
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+    games = set()
+    for chunk in pd.read_csv(csv_path, usecols=['Games'], dtype=object, chunksize=chunksize):
+        games.update(chunk['Games'].dropna().unique())
+    write_manifest(csv_path, games)
+    return games
+
+
+def parse_height(values):
+    """Heights in cm; Tokyo's metres/feet strings such as "1.65/5'4''" are converted"""
+    cm = pd.to_numeric(values, errors='coerce').astype('float64')
+    cm = cm.mask(cm < 3, (cm * 100).round(1))  # bare metres
+    if not pd.api.types.is_numeric_dtype(values):
+        text = values.astype(object).where(values.notna(), '').astype(str)
+        metres = pd.to_numeric(text.str.extract(r"^\s*(\d+(?:\.\d+)?)\s*/", expand=False), errors='coerce')
+        cm = cm.fillna((metres * 100).round(1))
+        feet = text.str.extract(r"(\d+)'\s*(\d*)")
+        inches = pd.to_numeric(feet[0], errors='coerce') * 12 + pd.to_numeric(feet[1], errors='coerce').fillna(0)
+        cm = cm.fillna((inches * 2.54).round(1))
+    return cm.where(cm.between(*HEIGHT_RANGE_CM)).astype('float64')
+
+
+def age_on(birth_dates, date):
+    """Whole years from each birth date to date; NaN where the birth date is missing or invalid"""
+    born = pd.to_datetime(birth_dates, errors='coerce')
+    date = pd.Timestamp(date)
+    before_birthday = (born.dt.month > date.month) | ((born.dt.month == date.month) & (born.dt.day > date.day))
+    return (date.year - born.dt.year - before_birthday).astype('float64')
+
+
+def normalize_names(names):
+    # case, accent, punctuation and token-order insensitive ('SURNAME Given' == 'Given Surname')
+    folded = (names.fillna('').str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+              .str.lower().str.replace(r"[^a-z]+", ' ', regex=True).str.split())
+    return folded.map(lambda tokens: ' '.join(sorted(tokens)))
+
+
+def intern_keys(left, right):
+    # shared integer ids for equal values on both sides; missing values get id 0
+    codes, uniques = pd.factorize(pd.concat([left, right], ignore_index=True))
+    codes = codes.astype(np.int64) + 1
+    return codes[:len(left)], codes[len(left):], len(uniques) + 1
+
+
+def combine_keys(*parts):
+    # parts are (left codes, right codes, cardinality) triples from intern_keys
+    left = np.zeros(len(parts[0][0]), dtype=np.int64)
+    right = np.zeros(len(parts[0][1]), dtype=np.int64)
+    for left_codes, right_codes, size in parts:
+        left = left * size + left_codes
+        right = right * size + right_codes
+    return left, right
+
+
+def hash_lookup(keys, probes, unique_only=False):
+    # position of each probe in keys, -1 when absent (or ambiguous with unique_only)
+    table = pd.Series(np.arange(len(keys)), index=keys)
+    duplicated = table.index.duplicated(keep=False) if unique_only else table.index.duplicated()
+    table = table[~duplicated]
+    found = table.index.get_indexer(probes)
+    return np.where(found >= 0, table.to_numpy()[found], -1)
+
+
+def attribute_medals(athletes, medals):
+    """Attach medals to athletes on interned (name, Sport, NOC) integer keys.
+
+    Medals whose athlete has no Sport on record fall back to a (name, NOC)
+    key when that key is unambiguous. Returns one row per athlete medal
+    (with Sport, Event and Medal taken from the medal) plus one row per
+    athlete without a medal, in athlete order, and a dict of match counts.
+    """
+    names = intern_keys(normalize_names(athletes['Name']), normalize_names(medals['Name']))
+    sports = intern_keys(athletes['Sport'], medals['Sport'])
+    nocs = intern_keys(athletes['NOC'], medals['NOC'])
+
+    athlete_keys, medal_keys = combine_keys(names, sports, nocs)
+    athlete_pos = hash_lookup(athlete_keys, medal_keys)
+
+    exact = athlete_pos >= 0
+    athlete_keys, medal_keys = combine_keys(names, nocs)
+    athlete_pos[~exact] = hash_lookup(athlete_keys, medal_keys[~exact], unique_only=True)
+
+    matched = athlete_pos >= 0
+    medalled = np.zeros(len(athletes), dtype=bool)
+    medalled[athlete_pos[matched]] = True
+
+    rows = np.concatenate([athlete_pos[matched], np.flatnonzero(~medalled)])
+    medal_idx = np.concatenate([np.flatnonzero(matched), np.full(np.count_nonzero(~medalled), -1)])
+    order = np.argsort(rows, kind='stable')
+    rows, medal_idx = rows[order], medal_idx[order]
+
+    df = athletes.iloc[rows].reset_index(drop=True)
+    has_medal = medal_idx >= 0
+    for col in ['Sport', 'Event', 'Medal']:
+        values = df[col].astype(object) if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+        values[has_medal] = medals[col].to_numpy()[medal_idx[has_medal]]
+        df[col] = values
+
+    report = {
+        'medals': len(medals),
+        'matched': int(matched.sum()),
+        'matched_by_name_noc': int((matched & ~exact).sum()),
+        'unmatched': int((~matched).sum()),
+        'medalled_athletes': int(medalled.sum()),
+    }
+    logger.info("medal attribution: %s", report)
+    return df, report
+
+
+def normalize_source(source):
+    """Map a new Games source onto the athlete_events schema; returns (df, attribution report)"""
+    athletes = pd.read_csv(source['athletes']).rename(columns=source['athlete_columns'])
+    medals = pd.read_csv(source['medals']).rename(columns=source['medal_columns'])
+
+    df, report = attribute_medals(athletes, medals)
+
+    for col, mapping in source.get('values', {}).items():
+        df[col] = df[col].replace(mapping)
+    for col, value in source['constants'].items():
+        df[col] = value
+
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df['Height'] = parse_height(df['Height'])
+    if 'age_on' in source and 'BirthDate' in df.columns:
+        df['Age'] = age_on(df['BirthDate'], source['age_on'])
+
+    # NOC falls back to Team and is always upper case
+    df['NOC'] = df['NOC'].fillna(df['Team']).str.upper()
+    return df[COLUMNS], report
+
+
+def append_edition(source, csv_path=UPDATED_CSV, replace=False, chunksize=CHUNKSIZE):
+    """Append the rows of a new edition to the updated CSV.
+
+    Games already in the CSV (per its manifest) are skipped unless
+    replace=True, which rewrites the whole CSV without their old rows
+    (streamed in chunks) before appending the new ones. Returns the Games
+    written and the medal attribution report.
+    """
+    df, report = normalize_source(source)
+    existing = ingested_games(csv_path, chunksize)
+    games = df['Games'].dropna().unique().tolist()
+    replaced = [game for game in games if game in existing]
+    if replaced and not replace:
+        df = df[~df['Games'].isin(replaced)]
+    elif replaced:
+        chunks = pd.read_csv(csv_path, usecols=COLUMNS, dtype=DTYPES, chunksize=chunksize)
+        write_chunks((chunk[~chunk['Games'].isin(replaced)] for chunk in chunks), csv_path)
+    if len(df):
+        df.to_csv(csv_path, mode='a', header=not os.path.exists(csv_path), index=False)
+        write_manifest(csv_path, existing | set(games))
+    return [game for game in games if replace or game not in existing], report
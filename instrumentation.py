@@ -0,0 +1,220 @@
+"""Timing spans, latency histograms and an opt-in page profiler.
+
+Spans are recorded by kind (load, helper, artifact, render, style, page,
+request) and name into fixed-bucket histograms, once for the process and
+once for the session that ran them. A span costs two perf_counter calls
+and a bisect under a lock, so they are always on. The histograms are
+exported in the Prometheus text format or as JSON:
+
+    OLYMPICS_METRICS_PORT=9100 streamlit run app.py    # GET :9100/metrics, :9100/metrics.json
+    OLYMPICS_METRICS_LOG=spans.jsonl streamlit run app.py   # one JSON line per span ('-' for stderr)
+
+The query API serves the same registry at /metrics. PageProfiler runs a
+single page rerun under cProfile (a .prof file for pstats or snakeviz) or
+a stack sampler that writes folded stacks, the input format of
+flamegraph.pl and speedscope.
+"""
+import bisect
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# upper bounds in seconds, as in the Prometheus client's defaults
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_SESSIONS = 256
+METRICS_LOG = os.environ.get("OLYMPICS_METRICS_LOG")
+PROFILE_DIR = Path(os.environ.get("OLYMPICS_PROFILE_DIR", ".cache/profiles"))
+SAMPLE_INTERVAL = 0.005
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.sum, 6),
+            'mean_ms': round(self.sum / self.count * 1e3, 3) if self.count else None,
+            'p50_le_ms': self.quantile(0.5) * 1e3,
+            'p99_le_ms': self.quantile(0.99) * 1e3,
+        }
+
+
+class Metrics:
+    def __init__(self, log_path=METRICS_LOG, max_sessions=MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._totals = defaultdict(Histogram)
+        self._sessions = OrderedDict()
+        self._log = None
+        if log_path == '-':
+            self._log = sys.stderr
+        elif log_path:
+            self._log = open(log_path, 'a', buffering=1)
+
+    def observe(self, kind, name, seconds, session=None):
+        key = (kind, str(name))
+        with self._lock:
+            self._totals[key].observe(seconds)
+            if session is not None:
+                if session not in self._sessions and len(self._sessions) >= self.max_sessions:
+                    self._sessions.popitem(last=False)
+                histograms = self._sessions.setdefault(session, defaultdict(Histogram))
+                self._sessions.move_to_end(session)
+                histograms[key].observe(seconds)
+            if self._log is not None:
+                self._log.write(json.dumps({'ts': time.time(), 'session': session, 'kind': kind, 'name': key[1],
+                                            'ms': round(seconds * 1e3, 3)}) + '\n')
+
+    @contextmanager
+    def span(self, kind, name, session=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, name, time.perf_counter() - start, session)
+
+    def snapshot(self, session=None):
+        """Histograms as {kind: {name: summary}}, for the process or one session"""
+        with self._lock:
+            histograms = self._totals if session is None else self._sessions.get(session, {})
+            result = defaultdict(dict)
+            for (kind, name), histogram in sorted(histograms.items()):
+                result[kind][name] = histogram.to_dict()
+        return dict(result)
+
+    def prometheus(self):
+        """Process-wide histograms in the Prometheus text exposition format"""
+        lines = ["# HELP olympics_span_seconds Duration of instrumented spans.",
+                 "# TYPE olympics_span_seconds histogram"]
+        with self._lock:
+            for (kind, name), histogram in sorted(self._totals.items()):
+                labels = f'kind="{kind}",name="{escape(name)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'olympics_span_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'olympics_span_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'olympics_span_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'olympics_span_seconds_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = Metrics()
+
+
+def serve(port, metrics=METRICS):
+    """Serve /metrics (Prometheus text) and /metrics.json from a daemon thread"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    return server
+
+
+class StackSampler:
+    """Samples one thread's Python stack every interval seconds into folded-stack counts"""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="stack-sampler")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class PageProfiler:
+    """Profile one page rerun: mode 'cprofile' writes a .prof file, 'sample' a folded flamegraph"""
+
+    def __init__(self, mode, label, directory=PROFILE_DIR):
+        if mode not in ('cprofile', 'sample'):
+            raise ValueError("profile mode must be 'cprofile' or 'sample'")
+        self.mode = mode
+        stem = ''.join(c if c.isalnum() else '_' for c in label).strip('_') or 'page'
+        suffix = 'prof' if mode == 'cprofile' else 'folded'
+        self.path = Path(directory) / f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}.{suffix}"
+
+    def start(self):
+        if self.mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        else:
+            self._profiler = StackSampler(threading.get_ident())
+            self._profiler.start()
+
+    def stop(self):
+        """Stop profiling and write the profile; returns its path"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+            self._profiler.dump_stats(self.path)
+        else:
+            self._profiler.stop()
+            self.path.write_text(self._profiler.folded())
+        return self.path
@@ -0,0 +1,381 @@
+"""Incremental aggregate maintenance for results arriving during a Games.
+
+LiveAggregates holds the athlete frame and the structures the helpers
+read (medal cube, deduplicated medal events, athlete ranking, row index,
+trend counts, name index) and applies batches of rows in the medals.csv
+schema as deltas: cube cells are incremented, new medal events merged
+into their sorted place, ranking counts bumped or inserted, only the
+batch's Years recounted in the trends and only new names added to the
+name index. Appended rows are kept in a tail frame with a row index of
+its own next to the base one, and categorical columns gain the batch's
+new categories first so that they stay categorical.
+
+New rows are attached to an existing AthleteID on (normalized name, NOC,
+Sport), then on an unambiguous (normalized name, NOC), like ingest's
+medal attribution; otherwise the athlete gets the next free ID. check()
+recomputes every structure from the current frame and reports any
+difference:
+
+    python live.py medals_batch.csv [more.csv ...] --year 2024 --city Paris
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import datastore
+import helper
+import ingest
+import name_search
+import preprocessor
+
+MEDALS = ['Gold', 'Silver', 'Bronze']
+SEX_VALUES = {'M': 'M', 'W': 'F', 'F': 'F'}
+RESULT_KEYS = ['Games', 'Name', 'NOC', 'Sport', 'Event', 'Medal']
+
+
+def athlete_lookup(athletes, columns):
+    # key tuple -> AthleteID, or -1 when several athletes share the key
+    groups = athletes.drop_duplicates(columns + ['AthleteID']).groupby(columns)['AthleteID'].agg(['first', 'size'])
+    return dict(zip(groups.index, np.where(groups['size'] == 1, groups['first'], -1)))
+
+
+class LiveAggregates:
+    def __init__(self, df, region_df, games=None, structures=None):
+        # structures: any of cube, medal_events, ranking, row_index, trends and name_index already built from df
+        structures = structures or {}
+        self.base = df
+        self.tail = df.iloc[0:0]
+        self._df = df
+        self.partitions = preprocessor.build_partitions(df)
+        self.regions = region_df.drop_duplicates('NOC').set_index('NOC')['region']
+        self.games = games or ingest.TOKYO_2020['constants']
+        self.cube = structures['cube'] if 'cube' in structures else preprocessor.build_medal_cube(df)
+        self.medal_events = (structures['medal_events'] if 'medal_events' in structures
+                             else preprocessor.build_medal_events(df))
+        self.ranking = structures['ranking'] if 'ranking' in structures else preprocessor.build_athlete_ranking(df)
+        self.row_index = structures['row_index'] if 'row_index' in structures else preprocessor.build_row_index(df)
+        self.trends = structures['trends'] if 'trends' in structures else preprocessor.build_trends(df)
+        self.name_index = (structures['name_index'] if 'name_index' in structures
+                           else name_search.build_name_index(df))
+        self.batches = 0
+
+        medals = df.dropna(subset=['Medal'])
+        self.event_keys = set(medals[preprocessor.MEDAL_EVENT_KEYS].drop_duplicates().itertuples(index=False, name=None))
+        # a result sent twice must not be counted twice
+        self.result_keys = set(medals[RESULT_KEYS].astype(object).itertuples(index=False, name=None))
+
+        athletes = df.drop_duplicates(['AthleteID', 'Name', 'NOC', 'Sport'])
+        athletes = pd.DataFrame({
+            'key': ingest.normalize_names(athletes['Name'].astype(object)).to_numpy(),
+            'NOC': athletes['NOC'].astype(object).to_numpy(),
+            'Sport': athletes['Sport'].astype(object).to_numpy(),
+            'AthleteID': athletes['AthleteID'].to_numpy(),
+        })
+        self.by_sport = athlete_lookup(athletes, ['key', 'NOC', 'Sport'])
+        self.by_noc = athlete_lookup(athletes, ['key', 'NOC'])
+        self.next_id = int(df['AthleteID'].max()) + 1 if len(df) else 0
+
+    @property
+    def df(self):
+        """The whole frame, base then appended rows; concatenated on first use after a batch"""
+        if self._df is None:
+            self._df = pd.concat([self.base, self.tail])
+        return self._df
+
+    def rows_from_medals(self, medals, games):
+        """medals.csv rows -> rows in the athlete frame's schema"""
+        source = ingest.TOKYO_2020
+        rows = medals.rename(columns={**source['medal_columns'], 'country': 'Team', 'athlete_sex': 'Sex'})
+        rows['Medal'] = rows['Medal'].replace(source['values']['Medal'])
+        rows['Sex'] = rows['Sex'].map(SEX_VALUES) if 'Sex' in rows.columns else None
+        for col, value in games.items():
+            rows[col] = value
+        rows['region'] = rows['NOC'].map(self.regions)
+        for medal in MEDALS:
+            if medal in self.base.columns:
+                rows[medal] = rows['Medal'] == medal
+
+        rows['AthleteID'] = self.assign_ids(rows)
+        rows = rows.reindex(columns=self.base.columns)
+        return rows
+
+    def assign_ids(self, rows):
+        ids = []
+        for key, noc, sport in zip(ingest.normalize_names(rows['Name']), rows['NOC'], rows['Sport']):
+            athlete = self.by_sport.get((key, noc, sport), -1)
+            if athlete == -1:
+                athlete = self.by_noc.get((key, noc), -1)
+            if athlete == -1:
+                athlete = self.next_id
+                self.next_id += 1
+                self.by_noc[(key, noc)] = athlete
+            self.by_sport[(key, noc, sport)] = athlete
+            ids.append(int(athlete))
+        return np.array(ids, dtype=np.int32)
+
+    def append_rows(self, rows):
+        """Append rows after the tail; returns them in the frame's dtypes, indexed by frame position.
+
+        New values of a categorical column are added to its categories (after
+        the existing ones) on base and tail alike, so both keep one dtype and
+        concatenating them stays categorical. Neither frame is copied.
+        """
+        rows = rows.copy()
+        base, tail = self.base.copy(deep=False), self.tail.copy(deep=False)
+        for col in base.columns:
+            dtype = base[col].dtype
+            if isinstance(dtype, pd.CategoricalDtype):
+                new = pd.Index(rows[col].dropna().unique()).difference(dtype.categories)
+                if len(new):
+                    dtype = pd.CategoricalDtype(dtype.categories.append(new))
+                    base[col], tail[col] = extend(base[col], dtype), extend(tail[col], dtype)
+                rows[col] = rows[col].astype(dtype)
+            else:
+                rows[col] = rows[col].astype(dtype)
+        rows.index = pd.RangeIndex(len(base) + len(tail), len(base) + len(tail) + len(rows))
+        self.base, self.tail, self._df = base, pd.concat([tail, rows]), None
+        return rows
+
+    def apply(self, medals, games=None):
+        """Apply a batch of medals.csv rows; returns the number of rows added.
+
+        Every structure is replaced by a new object rather than changed in
+        place, so readers still holding the previous ones are unaffected.
+        """
+        rows = self.rows_from_medals(medals, games or self.games)
+        keys = rows[RESULT_KEYS].astype(object).itertuples(index=False, name=None)
+        fresh = []
+        for key in keys:
+            fresh.append(key not in self.result_keys)
+            self.result_keys.add(key)
+        rows = rows[np.array(fresh, dtype=bool)]
+        if rows.empty:
+            return 0
+
+        first_pos = self.ranking['size'] - 1
+        rows = self.append_rows(rows)
+        medal_rows = rows.dropna(subset=['Medal'])
+
+        self.update_cube(medal_rows)
+        self.update_medal_events(medal_rows)
+        self.update_ranking(rows, medal_rows, first_pos)
+        self.update_row_index()
+        self.update_trends(rows['Year'].unique())
+        self.name_index = self.name_index.add(rows.set_index('AthleteID')['Name'].astype(object),
+                                              medals=medal_rows['AthleteID'].value_counts(),
+                                              appearances=rows['AthleteID'].value_counts())
+        self.batches += 1
+        return len(rows)
+
+    def update_cube(self, medal_rows):
+        delta = medal_rows.groupby(['Year', 'region', 'Medal'], observed=True).size().unstack(fill_value=0)
+        cube = self.cube.add(delta, fill_value=0).fillna(0).astype(np.int64)
+        # the union of the two indexes loses the region dtype; restore it and the rebuild's (Year, region) order
+        cube.index = pd.MultiIndex.from_arrays(
+            [cube.index.get_level_values('Year'),
+             pd.Categorical(cube.index.get_level_values('region'), dtype=self.base['region'].dtype)],
+            names=cube.index.names)
+        self.cube = cube.sort_index()
+
+    def update_medal_events(self, medal_rows):
+        keys = list(medal_rows[preprocessor.MEDAL_EVENT_KEYS].itertuples(index=False, name=None))
+        new = []
+        for i, key in enumerate(keys):
+            if key not in self.event_keys:
+                self.event_keys.add(key)
+                new.append(i)
+        if not new:
+            return
+        events = medal_rows.iloc[new][['region', 'Year', 'Sport', 'Medal']].set_index('region')
+        medal_events = widen(self.medal_events, events)
+        # merged after the existing events of their region, where a stable sort of both would put them
+        positions = sort_codes(events.index)
+        order = np.argsort(positions, kind='stable')
+        at = np.searchsorted(sort_codes(medal_events.index), positions[order], side='right')
+        self.medal_events = pd.DataFrame(
+            {col: insert(medal_events[col], at, events[col].iloc[order]) for col in medal_events.columns},
+            index=pd.Index(insert(medal_events.index, at, events.index[order]), name=medal_events.index.name))
+
+    def update_ranking(self, rows, medal_rows, first_pos):
+        attributes = self.ranking['attributes']
+        added = rows.drop_duplicates('AthleteID')
+        added = added[~added['AthleteID'].isin(attributes.index)].set_index('AthleteID')[['Name', 'Sport', 'region']]
+        ranking = {**self.ranking, 'attributes': pd.concat([widen(attributes, added), added]),
+                   'size': self.ranking['size'] + len(medal_rows)}
+
+        medal_rows = pd.DataFrame({
+            'AthleteID': medal_rows['AthleteID'].to_numpy(),
+            'Overall': 'Overall',
+            'Sport': medal_rows['Sport'].to_numpy(),
+            'region': medal_rows['region'].to_numpy(),
+            'pos': first_pos + np.arange(len(medal_rows)),
+        })
+        for scope in ['Overall', 'Sport', 'region']:
+            ranking[scope] = dict(ranking[scope])
+            deltas = medal_rows.groupby([scope, 'AthleteID'], observed=True).agg(Medals=('pos', 'size'), first=('pos', 'min'))
+            for (key, athlete), medals, first in zip(deltas.index, deltas['Medals'], deltas['first']):
+                ids, counts, firsts = ranking[scope].get(key, (np.array([], dtype=np.int32), np.array([], dtype=np.int64),
+                                                               np.array([], dtype=np.int64)))
+                at = np.searchsorted(ids, athlete)
+                if at < len(ids) and ids[at] == athlete:
+                    counts = counts.copy()
+                    counts[at] += medals
+                else:
+                    ids, counts, firsts = np.insert(ids, at, athlete), np.insert(counts, at, medals), np.insert(firsts, at, first)
+                ranking[scope][key] = (ids, counts, firsts)
+        self.ranking = ranking
+
+    def update_row_index(self):
+        # the base positions stay as built; the appended rows get a row index of their own
+        appended = (self.tail, preprocessor.build_row_index(self.tail, list(self.row_index)))
+        self.row_index = {col: (lookup, order, offsets, appended)
+                          for col, (lookup, order, offsets, _) in self.row_index.items()}
+
+    def update_trends(self, years):
+        # only the given Years are recounted, from their base partitions and the appended rows
+        columns = list(preprocessor.trend_columns())
+        trends = dict(self.trends)
+        for year in years:
+            rows = pd.concat([helper.take_partitions(self.base, self.partitions, year=year)[columns],
+                              self.tail.loc[self.tail['Year'] == year, columns]])
+            for name, counts in preprocessor.build_trends(rows).items():
+                previous = trends[name].drop(index=year, errors='ignore')
+                if isinstance(counts, pd.DataFrame):
+                    columns_seen = counts.columns.append(previous.columns.difference(counts.columns, sort=False))
+                    previous = previous.reindex(columns=columns_seen, fill_value=0)
+                    counts = counts.reindex(columns=columns_seen, fill_value=0)
+                trends[name] = pd.concat([previous, counts]).sort_index()
+        self.trends = trends
+
+    def check(self):
+        """Compare every maintained structure with a full recompute; returns a list of differences"""
+        df = self.df
+        problems = []
+        full = preprocessor.build_athlete_ranking(df)
+        checks = [
+            ('cube', self.cube, preprocessor.build_medal_cube(df)),
+            ('medal_events', self.medal_events.reset_index(), preprocessor.build_medal_events(df).reset_index()),
+            ('attributes', self.ranking['attributes'], full['attributes']),
+        ]
+        if full['size'] != self.ranking['size']:
+            problems.append(f"ranking size {self.ranking['size']} != {full['size']}")
+        for scope in ['Overall', 'Sport', 'region']:
+            checks.append((f"ranking[{scope}]", ranking_frame(self.ranking[scope]), ranking_frame(full[scope])))
+        row_index = preprocessor.build_row_index(df, list(self.row_index))
+        for col in self.row_index:
+            checks.append((f"row_index[{col}]", row_index_frame(self.row_index, col), row_index_frame(row_index, col)))
+        trends = preprocessor.build_trends(df)
+        for name, counts in trends.items():
+            live, rebuilt = self.trends[name], counts
+            if isinstance(rebuilt, pd.Series):
+                live, rebuilt = live.to_frame(), rebuilt.to_frame()
+            checks.append((f"trends[{name}]", live, rebuilt))
+        checks.append(('name_index', name_index_frame(self.name_index), name_index_frame(name_search.build_name_index(df))))
+
+        for name, live, rebuilt in checks:
+            try:
+                pd.testing.assert_frame_equal(live, rebuilt, check_dtype=False, check_categorical=False,
+                                              check_index_type=False, check_column_type=False)
+            except AssertionError as e:
+                problems.append(f"{name}: {e}")
+        return problems
+
+
+def codes(values):
+    # category codes of a categorical Series or Index
+    return np.asarray(values.codes if isinstance(values, pd.Index) else values.cat.codes)
+
+
+def extend(values, dtype):
+    """A categorical Series or Index in dtype, whose categories begin with its own; the codes are kept"""
+    categorical = pd.Categorical.from_codes(codes(values), dtype=dtype)
+    if isinstance(values, pd.Index):
+        return pd.CategoricalIndex(categorical, name=values.name)
+    return pd.Series(categorical, index=values.index, name=values.name)
+
+
+def widen(frame, rows):
+    """frame with its categorical columns and index in the (extended) dtypes of rows"""
+    frame = frame.copy(deep=False)
+    for col in frame.columns:
+        if isinstance(rows[col].dtype, pd.CategoricalDtype) and rows[col].dtype is not frame[col].dtype:
+            frame[col] = extend(frame[col], rows[col].dtype)
+    if isinstance(rows.index.dtype, pd.CategoricalDtype) and rows.index.dtype is not frame.index.dtype:
+        frame.index = extend(frame.index, rows.index.dtype)
+    return frame
+
+
+def sort_codes(values):
+    # sort keys of a categorical: category order, missing values last
+    return np.where(codes(values) < 0, len(values.dtype.categories), codes(values))
+
+
+def insert(values, at, new):
+    """values with new (of the same dtype) inserted before positions at, as np.insert"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(np.insert(codes(values), at, codes(new)), dtype=values.dtype)
+    return np.insert(values.to_numpy(), at, np.asarray(new, dtype=values.dtype))
+
+
+def ranking_frame(scope):
+    """One ranking scope (key -> ids, medals, first) as a sorted frame"""
+    parts = [pd.DataFrame({'key': key, 'AthleteID': ids, 'Medals': medals, 'first': first})
+             for key, (ids, medals, first) in scope.items()]
+    frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['key', 'AthleteID', 'Medals', 'first'])
+    frame['key'] = frame['key'].astype(str)
+    return frame.sort_values(['key', 'AthleteID']).reset_index(drop=True)
+
+
+def row_index_frame(row_index, col):
+    """The value of every row a row index covers, by row position"""
+    lookup, order, offsets, appended = row_index[col]
+    labels = np.repeat(np.arange(len(lookup)), np.diff(offsets))
+    frame = pd.DataFrame({'position': order[offsets[0]:offsets[-1]],
+                          'value': np.array(list(lookup), dtype=object)[labels]})
+    if appended is not None:
+        rows, appended_index = appended
+        more = row_index_frame(appended_index, col)
+        more['position'] = rows.index.to_numpy()[more['position']]
+        frame = pd.concat([frame, more])
+    return frame.sort_values('position').reset_index(drop=True)
+
+
+def name_index_frame(index):
+    """Entries of a NameIndex in search priority order"""
+    order = np.argsort(-index.priority)
+    return pd.DataFrame({'athlete': index.athletes[order], 'name': index.names[order], 'key': index.keys[order]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply medal result batches incrementally and verify them")
+    parser.add_argument('batches', nargs='+', help="CSV files in the medals.csv schema")
+    parser.add_argument('--year', type=int, default=ingest.TOKYO_2020['constants']['Year'])
+    parser.add_argument('--city', default=ingest.TOKYO_2020['constants']['City'])
+    parser.add_argument('--season', default='Summer')
+    args = parser.parse_args()
+
+    df, region_df = datastore.load_dataset()
+    # the structures cover one season, as in the app and the API
+    df = helper.take_partitions(df, preprocessor.build_partitions(df), args.season)
+    games = {'Games': f"{args.year} {args.season}", 'Year': args.year, 'Season': args.season, 'City': args.city}
+    live = LiveAggregates(df, region_df, games)
+
+    for path in args.batches:
+        start = time.perf_counter()
+        added = live.apply(pd.read_csv(path))
+        print(f" {path}: {added} rows applied in {(time.perf_counter() - start) * 1e3:.1f} ms")
+
+    start = time.perf_counter()
+    problems = live.check()
+    print(f" full recompute and check: {(time.perf_counter() - start) * 1e3:.1f} ms")
+    for problem in problems:
+        print(f" MISMATCH {problem}")
+    if not problems:
+        print(" incremental state matches a full recompute")
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
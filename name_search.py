@@ -0,0 +1,259 @@
+"""Type-ahead search over athlete names.
+
+Names are folded with ingest.normalize_names (case, accents, punctuation
+and token order are ignored), so 'BOLT Usain' and 'Usain Bolt' share a
+key. Every token of every name goes into one sorted array, which makes
+the names matching a typed prefix a contiguous range found with two
+binary searches. Queries with no prefix match, such as misspellings,
+fall back to a trigram index scored by trigram overlap.
+
+Entries are (athlete, name) pairs, so an athlete recorded under several
+spellings is found by any of them; search() returns athlete IDs ordered
+by exact key match, then medals, then appearances, then alphabetically.
+add() returns an index with more entries and counts without rebuilding
+the existing ones, for results arriving during a Games (see live.py).
+"""
+import copy
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+import ingest
+
+FUZZY_MIN_SIMILARITY = 0.3
+
+
+def fold(query):
+    # scalar twin of ingest.normalize_names; the pandas string methods cost more than a lookup
+    ascii_text = unicodedata.normalize('NFKD', query).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sorted(re.sub(r"[^a-z]+", ' ', ascii_text.lower()).split()))
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def postings(codes, size):
+    # ids grouped by code, and code offsets into them (as in preprocessor.build_row_index)
+    order = np.argsort(codes, kind='stable').astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=size))])
+    return order, offsets
+
+
+def merge_sorted(values, ids, new_values, new_ids):
+    # new (value, id) pairs merged into values sorted by value, then id; new ids are all larger
+    order = np.lexsort((new_ids, new_values))
+    new_values, new_ids = new_values[order], new_ids[order]
+    at = np.searchsorted(values, new_values, side='right')
+    values = values.astype(np.result_type(values, new_values), copy=False)
+    return np.insert(values, at, new_values), np.insert(ids, at, new_ids).astype(np.int32)
+
+
+class NameIndex:
+    def __init__(self, names, medals=None, appearances=None):
+        # names: Series of names indexed by athlete ID; medals/appearances: counts by athlete ID
+        entries = pd.DataFrame({'athlete': names.index, 'name': names.to_numpy(dtype=object)})
+        entries = entries.dropna().drop_duplicates().sort_values(['name', 'athlete'], kind='stable')
+        self.names = entries['name'].to_numpy(dtype=object)
+        self.athletes = entries['athlete'].to_numpy()
+        size = len(self.names)
+        self.keys = ingest.normalize_names(pd.Series(self.names)).to_numpy(dtype=object)
+        self.max_variants = int(entries['athlete'].value_counts().max()) if size else 1
+        self.medals = self._align(medals)
+        self.appearances = self._align(appearances)
+        # entry ids in (name, athlete) order; entries added later are not in that order themselves
+        self.alphabetical = np.arange(size)
+
+        key_order = np.argsort(self.keys, kind='stable')
+        self.sorted_keys = self.keys[key_order].astype(str)
+        self.key_ids = key_order.astype(np.int32)
+
+        tokens = pd.Series(self.keys).str.split().explode().dropna()
+        token_order = np.argsort(tokens.to_numpy(dtype=str), kind='stable')
+        self.tokens = tokens.to_numpy(dtype=str)[token_order]
+        self.token_ids = tokens.index.to_numpy()[token_order].astype(np.int32)
+        self.max_tokens = int(tokens.index.value_counts().max()) if len(tokens) else 1
+
+        grams = pd.Series([sorted(trigrams(key)) for key in self.keys]).explode().dropna()
+        codes, uniques = pd.factorize(grams)
+        order, self.gram_offsets = postings(codes, len(uniques))
+        self.gram_ids = grams.index.to_numpy()[order].astype(np.int32)
+        self.gram_lookup = dict(zip(uniques.tolist(), range(len(uniques))))
+        self.gram_counts = np.bincount(grams.index.to_numpy(), minlength=size)
+        self._rank()
+
+    def _align(self, counts, athletes=None):
+        # counts by athlete ID, per entry (or per athlete of athletes)
+        athletes = self.athletes if athletes is None else athletes
+        aligned = np.zeros(len(athletes), dtype=np.int64)
+        if counts is not None and len(counts):
+            counts = pd.Series(counts)
+            found = np.flatnonzero(np.isin(athletes, counts.index.to_numpy()))
+            aligned[found] = counts.reindex(athletes[found]).to_numpy(dtype=np.int64)
+        return aligned
+
+    def _rank(self):
+        # priority: higher is better; the alphabetical position breaks ties
+        size = len(self.names)
+        position = np.empty(size, dtype=np.int64)
+        position[self.alphabetical] = np.arange(size)
+        self.priority = ((self.medals * (self.appearances.max(initial=0) + 1) + self.appearances) * size
+                         + (size - 1 - position)).astype(np.int64)
+        popular = np.arange(size)
+        if size > 100 * self.max_variants:
+            popular = np.argpartition(-self.priority, 100 * self.max_variants - 1)[:100 * self.max_variants]
+        self.popular = popular[np.argsort(-self.priority[popular])]
+
+    def add(self, names, medals=None, appearances=None):
+        """A copy of the index with the new entries of names and the medals/appearances added to the counts.
+
+        names, medals and appearances are indexed by athlete ID as in the
+        constructor; entries already present are ignored. Existing entries
+        keep their ids, so only the new ones are folded and split into
+        tokens and trigrams. This index is left unchanged.
+        """
+        index = copy.copy(self)
+        entries = pd.DataFrame({'athlete': names.index, 'name': names.to_numpy(dtype=object)})
+        entries = entries.dropna().drop_duplicates().sort_values(['name', 'athlete'], kind='stable')
+
+        # alphabetical insert positions; a run of equal names is ordered by athlete
+        sorted_names = self.names[self.alphabetical]
+        at, fresh = [], []
+        for name, athlete in zip(entries['name'], entries['athlete']):
+            lo = np.searchsorted(sorted_names, name, side='left')
+            hi = np.searchsorted(sorted_names, name, side='right')
+            run = self.athletes[self.alphabetical[lo:hi]]
+            if athlete not in run:
+                at.append(lo + np.searchsorted(run, athlete))
+                fresh.append(True)
+            else:
+                fresh.append(False)
+        entries = entries[np.array(fresh, dtype=bool)]
+
+        size, added = len(self.names), len(entries)
+        if added:
+            ids = np.arange(size, size + added)
+            new_names = entries['name'].to_numpy(dtype=object)
+            new_keys = ingest.normalize_names(pd.Series(new_names)).to_numpy(dtype=object)
+            index.names = np.concatenate([self.names, new_names])
+            index.athletes = np.concatenate([self.athletes, entries['athlete'].to_numpy()])
+            index.keys = np.concatenate([self.keys, new_keys])
+            index.alphabetical = np.insert(self.alphabetical, at, ids)
+            variants = pd.Series(index.athletes[np.isin(index.athletes, entries['athlete'].unique())]).value_counts()
+            index.max_variants = max(self.max_variants, int(variants.max()))
+
+            index.sorted_keys, index.key_ids = merge_sorted(self.sorted_keys, self.key_ids, new_keys.astype(str), ids)
+            tokens = pd.Series(new_keys, index=ids).str.split().explode().dropna()
+            index.tokens, index.token_ids = merge_sorted(self.tokens, self.token_ids, tokens.to_numpy(dtype=str),
+                                                         tokens.index.to_numpy())
+
+            # new trigrams get the next codes; each id goes at the end of its trigram's postings
+            grams = pd.Series([sorted(trigrams(key)) for key in new_keys], index=ids).explode().dropna()
+            index.gram_lookup = dict(self.gram_lookup)
+            for gram in grams.unique():
+                index.gram_lookup.setdefault(gram, len(index.gram_lookup))
+            codes = grams.map(index.gram_lookup).to_numpy(dtype=np.int64)
+            order = np.lexsort((grams.index.to_numpy(), codes))
+            codes, gram_ids = codes[order], grams.index.to_numpy()[order]
+            offsets = np.concatenate([self.gram_offsets,
+                                      np.full(len(index.gram_lookup) + 1 - len(self.gram_offsets), self.gram_offsets[-1])])
+            index.gram_ids = np.insert(self.gram_ids, offsets[codes + 1], gram_ids).astype(np.int32)
+            index.gram_offsets = offsets + np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(offsets) - 1))])
+            index.gram_counts = np.concatenate([self.gram_counts, np.bincount(grams.index.to_numpy() - size,
+                                                                              minlength=added)])
+
+        # a new spelling of a known athlete starts from the athlete's counts so far
+        new_athletes = entries['athlete'].to_numpy()
+        known = np.flatnonzero(np.isin(self.athletes, new_athletes))
+        known_medals = pd.Series(self.medals[known], index=self.athletes[known]).groupby(level=0).first()
+        known_appearances = pd.Series(self.appearances[known], index=self.athletes[known]).groupby(level=0).first()
+        index.medals = (np.concatenate([self.medals, self._align(known_medals, new_athletes)])
+                        + index._align(medals))
+        index.appearances = (np.concatenate([self.appearances, self._align(known_appearances, new_athletes)])
+                             + index._align(appearances))
+        index._rank()
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def top(self, ids, k):
+        """The k best of ids (which may contain repeats of up to max_tokens)"""
+        if len(ids) > k * self.max_tokens:
+            keep = k * self.max_tokens
+            ids = ids[np.argpartition(-self.priority[ids], keep - 1)[:keep]]
+        ids = np.unique(ids)
+        return ids[np.argsort(-self.priority[ids])][:k]
+
+    def exact(self, key):
+        lo = np.searchsorted(self.sorted_keys, key, side='left')
+        hi = np.searchsorted(self.sorted_keys, key, side='right')
+        return self.key_ids[lo:hi]
+
+    def prefix(self, tokens):
+        """Ids of names with a token starting with each query token"""
+        ranges = [(np.searchsorted(self.tokens, token), np.searchsorted(self.tokens, token + '\uffff'), token)
+                  for token in tokens]
+        ranges.sort(key=lambda bounds: bounds[1] - bounds[0])
+        ids = self.token_ids[ranges[0][0]:ranges[0][1]]
+        for lo, hi, token in ranges[1:]:
+            if not len(ids):
+                break
+            if 8 * len(ids) < hi - lo:
+                # few candidates left: checking their own tokens beats marking a wide range
+                keep = [any(part.startswith(token) for part in self.keys[i].split()) for i in ids]
+                ids = ids[np.array(keep, dtype=bool)]
+            else:
+                matched = np.zeros(len(self.names), dtype=bool)
+                matched[self.token_ids[lo:hi]] = True
+                ids = ids[matched[ids]]
+        return ids
+
+    def fuzzy(self, key, k):
+        """Ids of the k names sharing the most trigrams with key"""
+        grams = trigrams(key)
+        codes = [self.gram_lookup[gram] for gram in grams if gram in self.gram_lookup]
+        if not codes:
+            return np.empty(0, dtype=np.int32)
+        hits = np.concatenate([self.gram_ids[self.gram_offsets[c]:self.gram_offsets[c + 1]] for c in codes])
+        shared = np.bincount(hits, minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        similarity = shared[candidates] / (len(grams) + self.gram_counts[candidates] - shared[candidates])
+        candidates = candidates[similarity >= FUZZY_MIN_SIMILARITY]
+        similarity = similarity[similarity >= FUZZY_MIN_SIMILARITY]
+        best = np.lexsort((-self.priority[candidates], -similarity))[:k]
+        return candidates[best]
+
+    def search_entries(self, query, k=10):
+        """Up to k entry positions matching query, best first"""
+        key = fold(query or '')
+        if not key:
+            return self.popular[:k].tolist()
+
+        exact = self.exact(key)
+        ids = self.top(exact, k).tolist()
+        if len(ids) < k:
+            prefix = self.top(self.prefix(key.split()), k + len(exact))
+            ids += [i for i in prefix.tolist() if i not in ids][:k - len(ids)]
+        if len(ids) < k:
+            ids += [i for i in self.fuzzy(key, k + len(ids)).tolist() if i not in ids][:k - len(ids)]
+        return ids
+
+    def search(self, query, k=10):
+        """Up to k athlete IDs matching query, best first"""
+        # most athletes have a single spelling; widen only when variants crowd the top k
+        for width in sorted({k, k * self.max_variants}):
+            entries = self.search_entries(query, width)
+            athletes = pd.unique(self.athletes[entries])
+            if len(athletes) >= k or len(entries) < width:
+                break
+        return athletes[:k].tolist()
+
+
+def build_name_index(df):
+    medals = df.dropna(subset=['Medal'])['AthleteID'].value_counts()
+    names = df.set_index('AthleteID')['Name'].astype(object)
+    return NameIndex(names, medals=medals, appearances=df['AthleteID'].value_counts())
@@ -0,0 +1,162 @@
+"""Precompute every page aggregate into a versioned artifact store.
+
+Each (season, view, key) is one task in a process pool; workers load the
+dataset snapshot once, take each season's partitions from it and write
+their results under artifacts/<dataset version>/<season>/<view>/<key>.pkl. The app reads them lazily
+and falls back to computing a view when its artifact is missing.
+
+Usage:  python precompute.py [--workers N] [--views yearwise_medal_tally ...]
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+
+import datastore
+import helper
+import preprocessor
+
+ARTIFACT_DIR = Path(os.environ.get("OLYMPICS_ARTIFACT_DIR", "artifacts"))
+
+# view -> (keys to precompute, function computing one key from the worker context)
+VIEWS = {
+    'data_over_time': (
+        lambda ctx: ['region', 'Event', 'AthleteID'],
+        lambda ctx, col: helper.data_over_time(ctx['df'], col, trends=ctx['trends']),
+    ),
+    'event_heatmap': (
+        lambda ctx: ['Overall'],
+        lambda ctx, key: helper.event_heatmap(ctx['df']),
+    ),
+    'men_vs_women': (
+        lambda ctx: ['Overall'],
+        lambda ctx, key: helper.men_vs_women(ctx['df'], trends=ctx['trends']),
+    ),
+    'most_successful': (
+        lambda ctx: ['Overall'] + sorted(ctx['df']['Sport'].dropna().unique().tolist()),
+        lambda ctx, sport: helper.most_successful(ctx['df'], sport, ranking=ctx['ranking']),
+    ),
+    'yearwise_medal_tally': (
+        lambda ctx: sorted(ctx['df']['region'].dropna().unique().tolist()),
+        lambda ctx, country: helper.yearwise_medal_tally(ctx['df'], country, medal_events=ctx['medal_events']),
+    ),
+    'country_event_heatmap': (
+        lambda ctx: sorted(ctx['df']['region'].dropna().unique().tolist()),
+        lambda ctx, country: helper.country_event_heatmap(ctx['df'], country, medal_events=ctx['medal_events']),
+    ),
+    'most_successful_countrywise': (
+        lambda ctx: sorted(ctx['df']['region'].dropna().unique().tolist()),
+        lambda ctx, country: helper.most_successful_countrywise(ctx['df'], country, ranking=ctx['ranking']),
+    ),
+}
+
+# per-process dataset, and each season's rows and shared structures, filled by load_context
+_dataset = {}
+_context = {}
+
+
+def artifact_path(version, season, view, key, artifact_dir=ARTIFACT_DIR):
+    return Path(artifact_dir) / version / season / view / f"{quote(str(key), safe='')}.pkl"
+
+
+def load_artifact(view, key, version, season='Summer', artifact_dir=ARTIFACT_DIR):
+    """Return the precomputed result, or None when it has not been precomputed"""
+    path = artifact_path(version, season, view, key, artifact_dir)
+    if not path.exists():
+        return None
+    return pd.read_pickle(path)
+
+
+def load_context(season):
+    if not _dataset:
+        df, _ = datastore.load_dataset()
+        _dataset.update(df=df, partitions=preprocessor.build_partitions(df))
+    if season not in _context:
+        df = helper.take_partitions(_dataset['df'], _dataset['partitions'], season)
+        _context[season] = dict(
+            df=df,
+            medal_events=preprocessor.build_medal_events(df),
+            ranking=preprocessor.build_athlete_ranking(df),
+            trends=preprocessor.build_trends(df),
+        )
+    return _context[season]
+
+
+def load_contexts():
+    for season in preprocessor.SEASONS:
+        load_context(season)
+
+
+def compact(result):
+    """result without the unused categories of its columns and axes, which would otherwise be pickled too"""
+    result = result.copy(deep=False)
+    for col in result.columns:
+        if isinstance(result[col].dtype, pd.CategoricalDtype):
+            result[col] = result[col].cat.remove_unused_categories()
+    if isinstance(result.index, pd.CategoricalIndex):
+        result.index = result.index.remove_unused_categories()
+    if isinstance(result.columns, pd.CategoricalIndex):
+        result.columns = result.columns.remove_unused_categories()
+    return result
+
+
+def compute_artifact(version, season, view, key, artifact_dir):
+    start = time.perf_counter()
+    result = compact(VIEWS[view][1](load_context(season), key))
+
+    path = artifact_path(version, season, view, key, artifact_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    result.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    return view, key, time.perf_counter() - start
+
+
+def precompute(views=None, workers=None, artifact_dir=ARTIFACT_DIR):
+    """Compute all (season, view, key) artifacts for the current dataset version in parallel"""
+    version = datastore.dataset_version()
+    load_contexts()  # also builds the snapshot once, before the workers read it
+    tasks = [(season, view, key) for season in preprocessor.SEASONS for view in views or VIEWS
+             for key in VIEWS[view][0](load_context(season))]
+
+    start = time.perf_counter()
+    timings = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_contexts) as pool:
+        futures = [pool.submit(compute_artifact, version, season, view, key, artifact_dir)
+                   for season, view, key in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            view, key, seconds = future.result()
+            timings[view] = timings.get(view, 0.0) + seconds
+            if done % 50 == 0 or done == len(tasks):
+                print(f" {done}/{len(tasks)} artifacts", flush=True)
+
+    manifest = {
+        'version': version,
+        'artifacts': len(tasks),
+        'wall_seconds': round(time.perf_counter() - start, 3),
+        'cpu_seconds_per_view': {view: round(seconds, 3) for view, seconds in timings.items()},
+    }
+    (Path(artifact_dir) / version / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+    # artifacts of older dataset versions are never read again
+    for stale in Path(artifact_dir).iterdir():
+        if stale.is_dir() and stale.name != version:
+            shutil.rmtree(stale, ignore_errors=True)
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--views', nargs='+', choices=sorted(VIEWS), help="only these views")
+    args = parser.parse_args()
+
+    manifest = precompute(views=args.views, workers=args.workers)
+    print(f" Precomputed {manifest['artifacts']} artifacts in {manifest['wall_seconds']}s "
+          f"(version {manifest['version']})")
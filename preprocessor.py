@@ -1,12 +1,225 @@
+import numpy as np
 import pandas as pd
 
+import ingest
+
+# one medal per team result; team events otherwise count once per member
+MEDAL_EVENT_KEYS = ['Team', 'NOC', 'Games', 'Year', 'City', 'Sport', 'Event', 'Medal']
+
+# columns of the body-metrics table behind the height/weight view
+BODY_METRIC_COLUMNS = ['AthleteID', 'Sex', 'Sport', 'Height', 'Weight', 'Medal']
+
+# trend name -> (column counted, column it is broken down by, (column, value) rows are limited to)
+TREND_METRICS = {
+    'region': ('region', None, None),
+    'Event': ('Event', None, None),
+    'AthleteID': ('AthleteID', None, None),
+    'Sport': ('Sport', None, None),
+    'Male': ('AthleteID', None, ('Sex', 'M')),
+    'Female': ('AthleteID', None, ('Sex', 'F')),
+    'events_per_sport': ('Event', 'Sport', None),
+}
+# largest (groups x values) space counted with a bitmap; larger ones sort their keys
+TREND_BITMAP_LIMIT = 1 << 26
+
+# columns with a row-position index for per-entity lookups
+INDEX_COLUMNS = ['region', 'AthleteID', 'Sport', 'Year']
+
+# the snapshot is partitioned and its rows ordered by these, so each Games is a contiguous run of rows
+PARTITION_KEYS = ['Season', 'Year']
+SEASONS = ['Summer', 'Winter']
+
+# low-cardinality string columns stored as categoricals
+CATEGORY_COLUMNS = ['Sex', 'Team', 'NOC', 'Games', 'Season', 'City', 'Sport', 'Event', 'Medal', 'region', 'notes']
+
 def preprocess(df,region_df):
-    # filtering for summer olympics
-    df = df[df['Season'] == 'Summer']
     # merge with region_df
     df = df.merge(region_df, on='NOC', how='left')
     # dropping duplicates
     df.drop_duplicates(inplace=True)
     # one hot encoding medals
     df = pd.concat([df, pd.get_dummies(df['Medal'])], axis=1)
-    return df
\ No newline at end of file
+    # rows of one Games together, in the order of the snapshot's partitions
+    df = df.sort_values(PARTITION_KEYS, kind='stable')
+    return df
+
+
+def apply_schema(df):
+    # compact dtypes; applied at load time so every page shares the same layout
+    df = df.copy()
+    medal_columns = [col for col in df['Medal'].dropna().unique() if col in df.columns] if 'Medal' in df.columns else []
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    # names repeat once per entry of an athlete; as a categorical each distinct name is stored once
+    if 'Name' in df.columns:
+        df['Name'] = df['Name'].astype('category')
+
+    if 'Year' in df.columns:
+        df['Year'] = df['Year'].astype('int16')
+    if 'ID' in df.columns:
+        df['ID'] = pd.to_numeric(df['ID'], errors='coerce').astype('UInt32')
+    if 'Age' in df.columns:
+        df['Age'] = pd.to_numeric(df['Age'], errors='coerce').round().astype('UInt8')
+    if 'Height' in df.columns:
+        df['Height'] = ingest.parse_height(df['Height']).astype('float32')
+    if 'Weight' in df.columns:
+        df['Weight'] = pd.to_numeric(df['Weight'], errors='coerce').astype('float32')
+    for col in medal_columns:
+        df[col] = df[col].astype(bool)
+
+    return df
+
+
+def memory_usage_mb(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def raw_memory_usage_mb(columns):
+    """Memory the given columns would take in the dtypes read_csv gives them, before apply_schema"""
+    total = 0
+    for col in columns:
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            col = col.astype(col.cat.categories.dtype)
+        elif pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col):
+            col = col.astype('float64')
+        total += col.memory_usage(deep=True, index=False)
+    return total / 2 ** 20
+
+
+def build_medal_cube(df):
+    # (Year, region) x Medal counts; every medal tally is a slice-and-sum of this
+    medals = df.dropna(subset=['Medal'])
+    return medals.groupby(['Year', 'region', 'Medal'], observed=True).size().unstack(fill_value=0)
+
+
+def build_body_metrics(df):
+    # one row per (athlete, region) with both Height and Weight, for the height/weight view
+    athletes = df.drop_duplicates(subset=['AthleteID', 'region']).dropna(subset=['Height', 'Weight'])
+    athletes = athletes.assign(Medal=athletes['Medal'].astype(object).fillna('No Medal'))
+    return athletes[BODY_METRIC_COLUMNS].reset_index(drop=True)
+
+
+def build_partitions(df):
+    # (Season, Year) -> [start, stop) row range; rows are ordered by PARTITION_KEYS
+    seasons, season_labels = column_codes(df['Season'])
+    years, year_labels = column_codes(df['Year'])
+    keys = seasons * len(year_labels) + years
+    starts = np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1]).astype(np.int64)
+    stops = np.append(starts[1:], len(keys))
+    index = pd.MultiIndex.from_arrays([season_labels[seasons[starts]], year_labels[years[starts]]], names=PARTITION_KEYS)
+    if not index.is_unique:
+        raise ValueError("rows are not ordered by Season and Year")
+    return pd.DataFrame({'start': starts, 'stop': stops}, index=index)
+
+
+def build_row_index(df, columns=INDEX_COLUMNS):
+    # per column: value -> code, row positions grouped by code, code offsets into them, and
+    # (rows, their own row index) appended after df, which live.py fills in
+    row_index = {}
+    for col in columns:
+        codes, uniques = pd.factorize(df[col])
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        # missing values (code -1) sort first and are skipped
+        offsets = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+        lookup = dict(zip(uniques.tolist(), range(len(uniques))))
+        row_index[col] = (lookup, order, offsets, None)
+    return row_index
+
+
+def build_athlete_ranking(df):
+    # per-athlete medal counts overall, per Sport and per region, plus each
+    # athlete's first-seen Name/Sport/region; ties rank by first medal row
+    medals = df.dropna(subset=['Medal'])
+    medal_rows = pd.DataFrame({
+        'AthleteID': medals['AthleteID'].to_numpy(),
+        'Sport': medals['Sport'].to_numpy(),
+        'region': medals['region'].to_numpy(),
+        'pos': np.arange(len(medals)),
+    })
+
+    attributes = df.drop_duplicates('AthleteID').set_index('AthleteID')[['Name', 'Sport', 'region']]
+    ranking = {'attributes': attributes, 'size': len(medals) + 1}
+
+    medal_rows['Overall'] = 'Overall'
+    for scope in ['Overall', 'Sport', 'region']:
+        counts = medal_rows.groupby([scope, 'AthleteID'], observed=True).agg(Medals=('pos', 'size'), first=('pos', 'min'))
+        ranking[scope] = {
+            key: (group.index.get_level_values('AthleteID').to_numpy(), group['Medals'].to_numpy(),
+                  group['first'].to_numpy())
+            for key, group in counts.groupby(level=scope, observed=True)
+        }
+    return ranking
+
+
+def column_codes(values):
+    # integer codes and their labels; a missing value is a label of its own, as in drop_duplicates
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        labels = values.cat.categories
+    else:
+        codes, labels = pd.factorize(values, sort=True)
+        codes = codes.astype(np.int64)
+    missing = codes < 0
+    if missing.any():
+        codes[missing] = len(labels)
+        labels = labels.insert(len(labels), np.nan)
+    return codes, labels
+
+
+def distinct_counts(groups, n_groups, codes, n_codes):
+    # number of distinct codes within each group
+    keys = groups * n_codes + codes
+    if n_groups * n_codes <= TREND_BITMAP_LIMIT:
+        seen = np.zeros(n_groups * n_codes, dtype=bool)
+        seen[keys] = True
+        return seen.reshape(n_groups, n_codes).sum(axis=1)
+    return np.bincount(np.unique(keys) // n_codes, minlength=n_groups)
+
+
+def trend_columns(metrics=TREND_METRICS):
+    """Columns build_trends reads for these metrics"""
+    columns = {'Year': None}
+    for col, by, where in metrics.values():
+        columns.update(dict.fromkeys(c for c in (col, by, where and where[0]) if c))
+    return tuple(columns)
+
+
+def build_trends(df, metrics=TREND_METRICS):
+    # distinct counts per Year for every metric; each column is turned into
+    # integer codes once and shared by all metrics that use it
+    years, year_labels = column_codes(df['Year'])
+    year_index = pd.Index(year_labels, name='Year')
+    codes = {}
+
+    def coded(col):
+        if col not in codes:
+            codes[col] = column_codes(df[col])
+        return codes[col]
+
+    trends = {}
+    for name, (col, by, where) in metrics.items():
+        rows = slice(None)
+        if where is not None:
+            where_codes, where_labels = coded(where[0])
+            rows = where_codes == (where_labels.get_loc(where[1]) if where[1] in where_labels else -1)
+        values, labels = coded(col)
+        if by is None:
+            counts = distinct_counts(years[rows], len(year_labels), values[rows], len(labels))
+            trends[name] = pd.Series(counts, index=year_index, name=name)
+        else:
+            by_codes, by_labels = coded(by)
+            groups = years[rows] * len(by_labels) + by_codes[rows]
+            counts = distinct_counts(groups, len(year_labels) * len(by_labels), values[rows], len(labels))
+            trends[name] = pd.DataFrame(counts.reshape(len(year_labels), len(by_labels)), index=year_index,
+                                        columns=pd.Index(by_labels, name=by))
+    return trends
+
+
+def build_medal_events(df):
+    # deduplicated medal events, sorted by region so a country is one index slice
+    medals = df.dropna(subset=['Medal']).drop_duplicates(subset=MEDAL_EVENT_KEYS)
+    return medals[['region', 'Year', 'Sport', 'Medal']].set_index('region').sort_index(kind='stable')
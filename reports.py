@@ -0,0 +1,247 @@
+"""Batch export of per-country reports.
+
+For every region (or the ones given), the Country Insights analyses --
+medals per year, medals by sport and year, and the top athletes -- are
+written as a self-contained HTML page and/or a one-page PDF under
+reports/<dataset version>/<season>/<country>.<format>:
+
+    python reports.py [--countries India Norway] [--seasons Summer] [--formats html pdf] [--workers N]
+
+The dataset and each season's structures are loaded before the process
+pool starts, so forked workers share them instead of loading their own.
+Results come from the precompute.py artifacts when present and the
+heatmaps from the app's figure cache. Each report is written atomically
+and finished ones are skipped, so an interrupted export resumes where it
+stopped (--force rewrites them). Progress and throughput in countries/sec
+are printed as reports complete, and reports/<dataset version>/manifest.json
+lists every report exported for that version along with each run's summary.
+"""
+import argparse
+import base64
+import html
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from urllib.parse import quote
+
+import datastore
+import figure_cache
+import helper
+import precompute
+import preprocessor
+
+REPORT_DIR = Path(os.environ.get("OLYMPICS_REPORT_DIR", "reports"))
+FORMATS = ['html', 'pdf']
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1100px; color: #222; }}
+img {{ max-width: 100%; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 10px; text-align: left; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>{summary}</p>
+<h2>Medal Tally Over Years</h2>
+{medals}
+<h2>Performance by Sport Over Years</h2>
+{heatmap}
+<h2>Top 10 Athletes</h2>
+{athletes}
+<p><small>Dataset version {version}</small></p>
+</body>
+</html>
+"""
+
+
+def report_path(version, season, country, fmt, report_dir=REPORT_DIR):
+    return Path(report_dir) / version / season / f"{quote(country, safe=' ')}.{fmt}"
+
+
+def precomputed(version, season, name, country, compute):
+    """Precomputed artifact when available, otherwise computed from the season's structures"""
+    result = precompute.load_artifact(name, country, version, season)
+    return compute() if result is None else result
+
+
+def country_report(version, season, country):
+    """The report's data and chart images (PNG bytes, or None when there is nothing to draw)"""
+    ctx = precompute.load_context(season)
+    medals = precomputed(version, season, 'yearwise_medal_tally', country,
+                         lambda: helper.yearwise_medal_tally(ctx['df'], country, medal_events=ctx['medal_events']))
+    heatmap = precomputed(version, season, 'country_event_heatmap', country,
+                          lambda: helper.country_event_heatmap(ctx['df'], country, medal_events=ctx['medal_events']))
+    athletes = precomputed(version, season, 'most_successful_countrywise', country,
+                           lambda: helper.most_successful_countrywise(ctx['df'], country, ranking=ctx['ranking']))
+
+    heatmap_png = None
+    if not heatmap.empty:
+        # same key as the app's Country Insights page, so either one warms the other
+        heatmap_png = figure_cache.FigureCache().get_or_render(
+            'country_heatmap', {'country': country, 'season': season}, version,
+            lambda: figure_cache.render_country_heatmap(heatmap, country))
+    return {
+        'title': f"{country} at the {season} Olympics",
+        'summary': f"{int(medals['Medal'].sum())} medals in {len(medals)} editions" if not medals.empty
+                   else "No medals won.",
+        'medals_png': figure_cache.render_medal_trend(medals, country) if not medals.empty else None,
+        'heatmap_png': heatmap_png,
+        'athletes': athletes,
+    }
+
+
+def to_html(report, version):
+    def image(data, alt):
+        if data is None:
+            return "<p>No data available.</p>"
+        return f'<img alt="{html.escape(alt)}" src="data:image/png;base64,{base64.b64encode(data).decode()}">'
+
+    athletes = report['athletes']
+    return HTML_TEMPLATE.format(
+        title=html.escape(report['title']),
+        summary=html.escape(report['summary']),
+        medals=image(report['medals_png'], "Medals per year"),
+        heatmap=image(report['heatmap_png'], "Medals by sport and year"),
+        athletes=athletes.to_html(index=False) if not athletes.empty else "<p>No data available.</p>",
+        version=html.escape(version),
+    ).encode()
+
+
+def to_pdf(report, version):
+    """One A4 page: title, both charts and the athlete table"""
+    plt = figure_cache.pyplot()
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    fig = plt.figure(figsize=(8.27, 11.69))
+    grid = fig.add_gridspec(4, 1, height_ratios=[0.4, 2, 3.4, 2.6], hspace=0.3)
+    title = fig.add_subplot(grid[0])
+    title.text(0, 0.6, report['title'], fontsize=18, weight='bold')
+    title.text(0, 0.1, f"{report['summary']}  (dataset {version})", fontsize=9, color='#555')
+
+    axes = [title]
+    for row, key in [(1, 'medals_png'), (2, 'heatmap_png')]:
+        ax = fig.add_subplot(grid[row])
+        if report[key] is not None:
+            ax.imshow(plt.imread(io.BytesIO(report[key]), format='png'))
+        else:
+            ax.text(0.5, 0.5, "No data available.", ha='center', va='center')
+        axes.append(ax)
+
+    table = fig.add_subplot(grid[3])
+    athletes = report['athletes']
+    if not athletes.empty:
+        table.table(cellText=athletes.astype(str).to_numpy(), colLabels=athletes.columns.tolist(), loc='upper center')
+    else:
+        table.text(0.5, 0.5, "No athlete data available.", ha='center', va='center')
+    axes.append(table)
+    for ax in axes:
+        ax.axis('off')
+
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        pdf.savefig(fig)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def export_country(version, season, country, formats, report_dir):
+    start = time.perf_counter()
+    report = country_report(version, season, country)
+    for fmt in formats:
+        data = to_html(report, version) if fmt == 'html' else to_pdf(report, version)
+        path = report_path(version, season, country, fmt, report_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    return season, country, time.perf_counter() - start
+
+
+def export(countries=None, seasons=None, formats=FORMATS, workers=None, report_dir=REPORT_DIR, force=False):
+    """Write the reports that do not exist yet for the current dataset version; returns a summary"""
+    version = datastore.dataset_version()
+    seasons = seasons or preprocessor.SEASONS
+    # loaded here first, so forked workers inherit the frames instead of reading them again
+    precompute.load_contexts()
+
+    tasks, skipped, absent = [], 0, 0
+    for season in seasons:
+        regions = sorted(precompute.load_context(season)['df']['region'].dropna().unique().tolist())
+        for country in countries or regions:
+            if country not in regions:
+                absent += 1
+                print(f" {country} not present in the {season} Olympics data", flush=True)
+            elif not force and all(report_path(version, season, country, fmt, report_dir).exists() for fmt in formats):
+                skipped += 1
+            else:
+                tasks.append((season, country))
+    if skipped:
+        print(f" {skipped} reports already exported, resuming with {len(tasks)}", flush=True)
+
+    start = time.perf_counter()
+    seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers, initializer=precompute.load_contexts) as pool:
+        futures = [pool.submit(export_country, version, season, country, formats, report_dir)
+                   for season, country in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            season, country, elapsed = future.result()
+            seconds += elapsed
+            if done % 10 == 0 or done == len(futures):
+                rate = done / (time.perf_counter() - start)
+                print(f" {done}/{len(futures)} reports  {rate:.1f} countries/s  (last: {season} {country})",
+                      flush=True)
+
+    wall = time.perf_counter() - start
+    summary = {
+        'version': version,
+        'exported': len(tasks),
+        'skipped': skipped,
+        'not_present': absent,
+        'formats': list(formats),
+        'wall_seconds': round(wall, 3),
+        'countries_per_second': round(len(tasks) / wall, 2) if tasks else None,
+        'cpu_seconds_per_report': round(seconds / len(tasks), 3) if tasks else None,
+    }
+    if tasks:
+        write_manifest(Path(report_dir) / version / "manifest.json", summary, tasks)
+    return summary
+
+
+def write_manifest(path, summary, tasks):
+    """Merge a run into the version's manifest: every report exported so far, and each run's summary"""
+    try:
+        manifest = json.loads(path.read_text())
+    except FileNotFoundError:
+        manifest = {'version': summary['version'], 'reports': {}, 'runs': []}
+    for season, country in tasks:
+        formats = manifest['reports'].setdefault(season, {}).get(country, [])
+        manifest['reports'][season][country] = sorted(set(formats) | set(summary['formats']))
+    manifest['exported'] = sum(len(countries) for countries in manifest['reports'].values())
+    manifest['runs'].append(summary)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export per-country reports as HTML and/or PDF")
+    parser.add_argument('--countries', nargs='+', help="regions to export (default: every region)")
+    parser.add_argument('--seasons', nargs='+', choices=preprocessor.SEASONS, help="default: every season")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--output', type=Path, default=REPORT_DIR)
+    parser.add_argument('--force', action='store_true', help="rewrite reports that already exist")
+    args = parser.parse_args()
+
+    summary = export(args.countries, args.seasons, args.formats, args.workers, args.output, args.force)
+    print(f" Exported {summary['exported']} reports in {summary['wall_seconds']}s "
+          f"({summary['countries_per_second'] or 0} countries/s, {summary['skipped']} already done)")
@@ -0,0 +1,105 @@
+"""Bounded LRU/TTL memoization for helper functions.
+
+Results are keyed on the function, the dataset version, the positional
+arguments after the DataFrame and any other keyword arguments. Keyword
+arguments naming structures derived from the same dataset (cube=,
+medal_events=, ranking=, ...) are passed through but not keyed: the
+version already covers them. Cached results are shared between sessions,
+so callers must treat them as read-only.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+MAXSIZE = int(os.environ.get("OLYMPICS_RESULT_CACHE_SIZE", 2048))
+TTL = float(os.environ.get("OLYMPICS_RESULT_CACHE_TTL", 0)) or None
+
+# keyword arguments holding structures built from the dataset (see helper.uses)
+STRUCTURES = frozenset(['cube', 'medal_events', 'ranking', 'row_index', 'body_metrics', 'trends'])
+
+_caches = weakref.WeakSet()
+
+
+def _reset_caches():
+    # a forked worker must not inherit a lock held by another thread
+    for cache in list(_caches):
+        cache._reset()
+
+
+os.register_at_fork(after_in_child=_reset_caches)
+
+
+class ResultCache:
+    def __init__(self, maxsize=MAXSIZE, ttl=TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._reset()
+        _caches.add(self)
+
+    def _reset(self):
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._functions = {}
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def call(self, func, df, *args, version, **kwargs):
+        name = f"{func.__module__}.{func.__qualname__}"
+        options = tuple(sorted((key, value) for key, value in kwargs.items() if key not in STRUCTURES))
+        key = (name, version, args, options)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and now - entry[1] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._function_stats(name)['hits'] += 1
+                return entry[0]
+            self.misses += 1
+
+        # computed outside the lock; concurrent misses on one key may both compute
+        start = time.perf_counter()
+        result = func(df, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            stats = self._function_stats(name)
+            stats['misses'] += 1
+            stats['compute_seconds'] += elapsed
+            self._entries[key] = (result, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def _function_stats(self, name):
+        return self._functions.setdefault(name, {'hits': 0, 'misses': 0, 'compute_seconds': 0.0})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'functions': {
+                    name: dict(stats, mean_compute_ms=1e3 * stats['compute_seconds'] / stats['misses'] if stats['misses'] else 0.0)
+                    for name, stats in self._functions.items()
+                },
+            }
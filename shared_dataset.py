@@ -0,0 +1,168 @@
+"""The preprocessed frame published once per host for every app process.
+
+publish() writes the frame as an uncompressed Arrow IPC file, one buffer
+per column, under SHARED_DIR (POSIX shared memory in /dev/shm when it
+exists). Each process memory-maps it with attach() and wraps the
+buffers as pandas columns without copying them, so N workers share one
+copy in the page cache. The buffers are read-only: writing into a column
+raises, so derive new frames instead (as the helpers do).
+
+Columns are stored in a form that maps straight onto pandas arrays:
+categoricals as integer codes (-1 for missing) with the categories in
+the field metadata, booleans as uint8, nullable integers as values plus
+a separate uint8 mask, and strings as Arrow large_string.
+
+Each publish is a new generation: the file is written under a new name
+and the CURRENT pointer is replaced atomically, so attached processes
+notice the change and re-attach while readers of the previous
+generation keep their mapping:
+
+    python shared_dataset.py publish    # publish the current snapshot as the next generation
+    python shared_dataset.py status
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+_default_dir = "/dev/shm/olympics" if Path("/dev/shm").is_dir() else ".cache/shared"
+SHARED_DIR = Path(os.environ.get("OLYMPICS_SHARED_DIR", _default_dir))
+POINTER = "CURRENT"
+MASK_SUFFIX = ":mask"
+
+
+def encode(df):
+    """Arrow table of df's columns in their zero-copy storage form"""
+    arrays, fields = [], []
+
+    def add(name, array, kind, **meta):
+        arrays.append(array)
+        fields.append(pa.field(name, array.type, metadata={'kind': kind, **meta}))
+
+    for col in df.columns:
+        values = df[col]
+        dtype = values.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            add(col, pa.array(values.cat.codes.to_numpy()), 'category',
+                categories=json.dumps(dtype.categories.tolist()))
+        elif dtype == bool:
+            add(col, pa.array(values.to_numpy().view(np.uint8)), 'bool')
+        elif isinstance(dtype, pd.StringDtype) or dtype == object:
+            add(col, pa.array(values.astype(object).where(values.notna(), None), type=pa.large_string()), 'string')
+        elif isinstance(values.array, pd.arrays.IntegerArray):
+            add(col, pa.array(values.array._data), 'masked')
+            add(col + MASK_SUFFIX, pa.array(values.array._mask.view(np.uint8)), 'mask')
+        else:
+            add(col, pa.array(values.to_numpy()), 'numpy')
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def decode(table, field):
+    array = table.column(field.name).combine_chunks()
+    kind = field.metadata[b'kind'].decode()
+    if kind == 'string':
+        return pd.arrays.ArrowStringArray(array, dtype=pd.StringDtype('pyarrow', na_value=np.nan))
+    values = array.to_numpy(zero_copy_only=True)
+    if kind == 'category':
+        categories = json.loads(field.metadata[b'categories'])
+        return pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(categories))
+    if kind == 'bool':
+        return values.view(bool)
+    if kind == 'masked':
+        mask = table.column(field.name + MASK_SUFFIX).combine_chunks().to_numpy(zero_copy_only=True)
+        return pd.arrays.IntegerArray(values, mask.view(bool))
+    return values
+
+
+def read_pointer(directory=SHARED_DIR):
+    try:
+        return json.loads((Path(directory) / POINTER).read_text())
+    except FileNotFoundError:
+        return None
+
+
+def current_generation(directory=SHARED_DIR):
+    pointer = read_pointer(directory)
+    return pointer['generation'] if pointer else None
+
+
+def publish(df, version, directory=SHARED_DIR):
+    """Write df as the next generation and point CURRENT at it; returns the generation"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = read_pointer(directory)
+    generation = previous['generation'] + 1 if previous else 1
+
+    table = encode(df.reset_index(drop=True))
+    path = directory / f"athletes-g{generation}.arrow"
+    tmp_path = directory / f".{path.name}.{os.getpid()}.tmp"
+    with pa.OSFile(str(tmp_path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=max(len(table), 1))
+    os.replace(tmp_path, path)
+
+    pointer = {'generation': generation, 'file': path.name, 'version': version, 'rows': len(table)}
+    tmp_pointer = directory / f".{POINTER}.{os.getpid()}.tmp"
+    tmp_pointer.write_text(json.dumps(pointer))
+    os.replace(tmp_pointer, directory / POINTER)
+
+    # the previous generation stays for processes that read CURRENT just before the swap
+    keep = {path.name, previous['file']} if previous else {path.name}
+    for stale in directory.glob("athletes-g*.arrow"):
+        if stale.name not in keep:
+            stale.unlink(missing_ok=True)
+    return generation
+
+
+class SharedDataset:
+    """A memory-mapped generation of the published frame"""
+
+    def __init__(self, pointer, directory=SHARED_DIR):
+        self.generation = pointer['generation']
+        self.version = pointer['version']
+        self.path = Path(directory) / pointer['file']
+        self.table = pa.ipc.open_file(pa.memory_map(str(self.path), 'r')).read_all()
+        self.fields = {field.name: field for field in self.table.schema if not field.name.endswith(MASK_SUFFIX)}
+        self.columns = list(self.fields)
+
+    def column(self, name):
+        return pd.Series(decode(self.table, self.fields[name]), name=name, copy=False)
+
+    def frame(self, columns=None):
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({col: self.column(col) for col in columns}, copy=False)
+
+
+def attach(directory=SHARED_DIR):
+    """The current generation, or None when nothing has been published"""
+    pointer = read_pointer(directory)
+    if pointer is None:
+        return None
+    try:
+        return SharedDataset(pointer, directory)
+    except FileNotFoundError:
+        # replaced and removed between reading CURRENT and opening it
+        return attach(directory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the preprocessed dataset for every app process")
+    parser.add_argument('command', choices=['publish', 'status'])
+    parser.add_argument('--dir', default=SHARED_DIR, type=Path)
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        import datastore
+        df, _ = datastore.load_dataset()
+        generation = publish(df, datastore.dataset_version(), args.dir)
+        print(f" published generation {generation}: {len(df):,} rows to {args.dir}")
+    else:
+        pointer = read_pointer(args.dir)
+        print(f" {args.dir}: {json.dumps(pointer) if pointer else 'nothing published'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+
+ATHLETES = pd.DataFrame({
+    'Name': ['KIM Je Deok', 'AN San', 'OH Jin Hyek', 'DRESSEL Caeleb', 'SMITH Jo', 'ONO Shohei',
+             'LEE Min', 'LEE Min'],
+    'NOC': ['KOR', 'KOR', 'KOR', 'USA', 'USA', 'JPN', 'CHN', 'CHN'],
+    'Team': ['Korea', 'Korea', 'Korea', 'USA', 'USA', 'Japan', 'China', 'China'],
+    # no Sport on record for ONO, so only the name and NOC can place his medal
+    'Sport': ['Archery', 'Archery', 'Archery', 'Swimming', 'Swimming', None, 'Diving', 'Badminton'],
+})
+MEDALS = pd.DataFrame([
+    ('KIM Je Deok', 'KOR', 'Archery', 'Mixed Team', 'Gold'),
+    ('AN San', 'KOR', 'Archery', 'Mixed Team', 'Gold'),
+    ('KIM Je Deok', 'KOR', 'Archery', "Men's Team", 'Gold'),
+    ('OH Jin Hyek', 'KOR', 'Archery', "Men's Team", 'Gold'),
+    ('AN San', 'KOR', 'Archery', "Men's Team", 'Gold'),
+    ('Caeleb Dressel', 'USA', 'Swimming', "Men's 100m Freestyle", 'Gold'),
+    ('DRESSEL Caeleb', 'USA', 'Swimming', "Men's 50m Freestyle", 'Gold'),
+    ('Shohei ONO', 'JPN', 'Judo', "Men -73 kg", 'Gold'),
+    # two LEE Min in CHN and neither in Table Tennis: ambiguous, left unmatched
+    ('LEE Min', 'CHN', 'Table Tennis', "Men's Singles", 'Silver'),
+], columns=['Name', 'NOC', 'Sport', 'Event', 'Medal'])
+
+
+@pytest.fixture(scope='module')
+def attributed():
+    return ingest.attribute_medals(ATHLETES, MEDALS)
+
+
+def test_each_medal_lands_on_its_athlete(attributed):
+    df, _ = attributed
+    medals = df.dropna(subset=['Medal'])
+    expected = [
+        ('KIM Je Deok', 'Mixed Team'), ('KIM Je Deok', "Men's Team"),
+        ('AN San', 'Mixed Team'), ('AN San', "Men's Team"),
+        ('OH Jin Hyek', "Men's Team"),
+        ('DRESSEL Caeleb', "Men's 100m Freestyle"), ('DRESSEL Caeleb', "Men's 50m Freestyle"),
+        ('ONO Shohei', 'Men -73 kg'),
+    ]
+    assert list(zip(medals['Name'], medals['Event'])) == expected
+
+
+def test_athletes_without_medals_keep_one_row(attributed):
+    df, _ = attributed
+    unmedalled = df[df['Medal'].isna()]
+    assert unmedalled['Name'].tolist() == ['SMITH Jo', 'LEE Min', 'LEE Min']
+    assert unmedalled['Sport'].tolist() == ['Swimming', 'Diving', 'Badminton']
+
+
+def test_rows_stay_in_athlete_order(attributed):
+    df, _ = attributed
+    order = df['Name'].map({name: i for i, name in enumerate(ATHLETES['Name'].drop_duplicates())})
+    assert order.is_monotonic_increasing
+
+
+def test_team_medals_are_not_multiplied_per_member(attributed):
+    df, _ = attributed
+    team = df[df['Event'] == "Men's Team"]
+    # one row per member's own medal row, and one medal per team result
+    assert sorted(team['Name']) == ['AN San', 'KIM Je Deok', 'OH Jin Hyek']
+    assert len(team.drop_duplicates(['Team', 'NOC', 'Sport', 'Event', 'Medal'])) == 1
+    assert len(df[df['Event'] == 'Mixed Team']) == 2
+
+
+def test_name_and_noc_fallback_takes_the_medal_sport(attributed):
+    df, _ = attributed
+    ono = df[df['Name'] == 'ONO Shohei']
+    assert ono[['Sport', 'Medal']].values.tolist() == [['Judo', 'Gold']]
+
+
+def test_report_counts(attributed):
+    _, report = attributed
+    assert report == {'medals': 9, 'matched': 8, 'matched_by_name_noc': 1, 'unmatched': 1, 'medalled_athletes': 5}
+
+
+def test_missing_values_do_not_match_each_other():
+    athletes = pd.DataFrame({'Name': ['A B', 'C D'], 'NOC': [None, 'USA'], 'Sport': [None, 'Rowing']})
+    medals = pd.DataFrame({'Name': ['X Y'], 'NOC': [None], 'Sport': [None], 'Event': ['E'], 'Medal': ['Gold']})
+    df, report = ingest.attribute_medals(athletes, medals)
+    assert report['matched'] == 0
+    assert df['Medal'].isna().all() and len(df) == 2
+    assert np.array_equal(df['Name'], athletes['Name'])
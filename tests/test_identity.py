@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import identity
+
+HISTORIC = [
+    # ID, Name, Sex, Age, NOC, Year, Sport
+    (5, 'Katie Ledecky', 'F', 19, 'USA', 2016, 'Swimming'),
+    (5, 'Kathleen Ledecky', 'F', 15, 'USA', 2012, 'Swimming'),
+    # namesakes in one NOC: a swimmer born 1990 and a rower born 1980
+    (20, 'John Smith', 'M', 26, 'USA', 2016, 'Swimming'),
+    (21, 'John Smith', 'M', 36, 'USA', 2016, 'Rowing'),
+    # namesakes nothing tells apart
+    (30, 'Anna Berg', 'F', 28, 'NOR', 2016, 'Rowing'),
+    (31, 'Anna Berg', 'F', 28, 'NOR', 2016, 'Rowing'),
+]
+TOKYO = [
+    ('LEDECKY Katie', 'F', 24, 'USA', 2020, 'Swimming'),
+    ('SMITH John', 'M', 30, 'USA', 2020, 'Swimming'),
+    ('BERG Anna', 'F', 32, 'NOR', 2020, 'Rowing'),
+    # same name, other NOC: not a candidate
+    ('SMITH John', 'M', 30, 'GBR', 2020, 'Swimming'),
+    # two rows of one new athlete
+    ('NEW Person', 'F', 21, 'KEN', 2020, 'Athletics'),
+    ('NEW Person', 'F', 21, 'KEN', 2020, 'Athletics'),
+]
+
+
+@pytest.fixture(scope='module')
+def resolved():
+    historic = pd.DataFrame(HISTORIC, columns=['ID', 'Name', 'Sex', 'Age', 'NOC', 'Year', 'Sport'])
+    tokyo = pd.DataFrame(TOKYO, columns=['Name', 'Sex', 'Age', 'NOC', 'Year', 'Sport']).assign(ID=np.nan)
+    df = pd.concat([historic, tokyo], ignore_index=True)
+    ids, report = identity.resolve_athletes(df)
+    return df.assign(AthleteID=ids), report
+
+
+def athlete(resolved, name, noc='USA', year=2020):
+    df, _ = resolved
+    ids = df.loc[(df['Name'] == name) & (df['NOC'] == noc) & (df['Year'] == year), 'AthleteID'].unique()
+    assert len(ids) == 1
+    return ids[0]
+
+
+def source(resolved, source_id):
+    df, _ = resolved
+    ids = df.loc[df['ID'] == source_id, 'AthleteID'].unique()
+    assert len(ids) == 1
+    return ids[0]
+
+
+def test_source_ids_are_trusted(resolved):
+    # one ID across spellings is one athlete; equal names under two IDs are two
+    assert source(resolved, 5) == athlete(resolved, 'Katie Ledecky', year=2016)
+    assert source(resolved, 20) != source(resolved, 21)
+    assert source(resolved, 30) != source(resolved, 31)
+
+
+def test_new_row_links_to_existing_athlete(resolved):
+    assert athlete(resolved, 'LEDECKY Katie') == source(resolved, 5)
+
+
+def test_namesakes_stay_apart(resolved):
+    # sport and birth year pick the swimmer; the rower is ten years off
+    assert athlete(resolved, 'SMITH John') == source(resolved, 20)
+    assert athlete(resolved, 'SMITH John') != source(resolved, 21)
+
+
+def test_other_noc_is_not_linked(resolved):
+    assert athlete(resolved, 'SMITH John', noc='GBR') not in {source(resolved, 20), source(resolved, 21)}
+
+
+def test_tie_stays_unlinked(resolved):
+    _, report = resolved
+    berg = athlete(resolved, 'BERG Anna', noc='NOR')
+    assert berg not in {source(resolved, 30), source(resolved, 31)}
+    assert report['ambiguous'] == 1
+
+
+def test_rows_of_a_new_athlete_share_one_new_id(resolved):
+    df, report = resolved
+    new = athlete(resolved, 'NEW Person', noc='KEN')
+    assert new not in set(df.loc[df['ID'].notna(), 'AthleteID'])
+    assert report['linked'] == 2
+    assert report['athletes'] == df['AthleteID'].nunique() == 8
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import identity
+import live
+import preprocessor
+
+REGIONS = pd.DataFrame({
+    'NOC': ['USA', 'GBR', 'NOR', 'IND', 'KEN'],
+    'region': ['USA', 'UK', 'Norway', 'India', 'Kenya'],
+    'notes': [None, None, None, None, None],
+})
+GAMES = [(2012, 'London'), (2016, 'Rio de Janeiro')]
+PARIS = {'Games': '2024 Summer', 'Year': 2024, 'Season': 'Summer', 'City': 'Paris'}
+
+
+def name(i):
+    # names are matched with digits and punctuation folded away, so each athlete gets a letters-only one
+    return f"Athlete {chr(97 + i // 26)}{chr(97 + i % 26)}"
+
+
+def medals(rows):
+    # medals.csv rows: (athlete_name, athlete_sex, country_code, discipline, event, medal_type)
+    batch = pd.DataFrame(rows, columns=['athlete_name', 'athlete_sex', 'country_code', 'discipline', 'event',
+                                        'medal_type'])
+    return batch.assign(medal_type=batch['medal_type'] + ' Medal', country=batch['country_code'])
+
+
+@pytest.fixture
+def aggregates():
+    rng = np.random.default_rng(3)
+    rows = []
+    for year, city in GAMES:
+        for i in range(300):
+            noc = REGIONS['NOC'][i % len(REGIONS)]
+            rows.append({
+                'ID': i, 'Name': name(i), 'Sex': 'MF'[i % 2], 'Age': 25, 'Height': 175.0,
+                'Weight': 70.0, 'Team': noc, 'NOC': noc, 'Games': f"{year} Summer", 'Year': year,
+                'Season': 'Summer', 'City': city, 'Sport': f"Sport {i % 5}", 'Event': f"Event {i % 15}",
+                'Medal': rng.choice(np.array(['Gold', 'Silver', 'Bronze', None, None], dtype=object)),
+            })
+    df = preprocessor.apply_schema(preprocessor.preprocess(pd.DataFrame(rows), REGIONS).reset_index(drop=True))
+    df['AthleteID'], _ = identity.resolve_athletes(df)
+    return live.LiveAggregates(df, REGIONS, PARIS)
+
+
+FIRST = medals([
+    # known athletes: the same name (in Tokyo's order), NOC and Sport
+    ('AA Athlete', 'M', 'USA', 'Sport 0', 'Event 0', 'Gold'),
+    ('AG Athlete', 'M', 'GBR', 'Sport 1', 'Event 6', 'Silver'),
+    # a new athlete of an NOC without a region
+    ('NEW Zed', 'M', 'ZZZ', 'Sport 2', 'Event 2', 'Bronze'),
+    # a Sport and Event never seen before
+    ('B-BOY One', 'M', 'USA', 'Breaking', "B-Boys", 'Gold'),
+    ('B-GIRL Two', 'W', 'NOR', 'Breaking', "B-Girls", 'Gold'),
+])
+SECOND = medals([
+    ('B-BOY One', 'M', 'USA', 'Breaking', 'Battle', 'Silver'),
+    ('NEW Zed', 'M', 'ZZZ', 'Sport 2', 'Event 7', 'Gold'),
+    ('AD Athlete', 'W', 'IND', 'Sport 3', 'Event 3', 'Bronze'),
+])
+
+
+def test_batches_match_a_full_recompute(aggregates):
+    assert aggregates.apply(FIRST) == len(FIRST)
+    assert aggregates.check() == []
+    assert aggregates.apply(SECOND) == len(SECOND)
+    assert aggregates.check() == []
+
+
+def test_new_categories_keep_categorical_columns(aggregates):
+    aggregates.apply(FIRST)
+    assert 'Breaking' in aggregates.medal_events['Sport'].cat.categories
+    assert isinstance(aggregates.df['Sport'].dtype, pd.CategoricalDtype)
+    assert aggregates.df['region'].iloc[-3:].isna().tolist() == [True, False, False]
+
+
+def test_repost_adds_nothing(aggregates):
+    aggregates.apply(FIRST)
+    cube, batches = aggregates.cube, aggregates.batches
+    assert aggregates.apply(FIRST) == 0
+    assert aggregates.batches == batches and aggregates.cube is cube
+    assert aggregates.check() == []
+
+
+def test_known_athletes_keep_their_id(aggregates):
+    before = aggregates.ranking['attributes']
+    aggregates.apply(FIRST)
+    rows = aggregates.df.iloc[-len(FIRST):]
+    known = before.index[before['Name'].astype(str).isin([name(0), name(6)])]
+    assert rows['AthleteID'].iloc[:2].tolist() == sorted(known.tolist())
+    assert not rows['AthleteID'].iloc[2:].isin(before.index).any()
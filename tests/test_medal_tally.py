@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import helper
+import preprocessor
+
+REGIONS = pd.DataFrame({
+    'NOC': ['USA', 'GBR', 'NOR', 'IND', 'KEN', 'FRA', 'ANZ'],
+    'region': ['USA', 'UK', 'Norway', 'India', 'Kenya', 'France', 'Australia'],
+    'notes': [None, None, None, None, None, None, 'Australasia'],
+})
+GAMES = [(1896, 'Summer', 'Athina'), (1924, 'Winter', 'Chamonix'), (1936, 'Summer', 'Berlin'),
+         (1994, 'Winter', 'Lillehammer'), (2016, 'Summer', 'Rio de Janeiro')]
+
+
+def groupby_medal_tally(df, year, country):
+    # fetch_medal_tally as it was before the medal cube
+    temp_df = df.dropna(subset=['Medal'])
+
+    if year != "Overall":
+        temp_df = temp_df[temp_df['Year'] == int(year)]
+    if country != "Overall":
+        temp_df = temp_df[temp_df['region'] == country]
+
+    medal_tally = temp_df.groupby(['region', 'Medal']).size().unstack(fill_value=0)
+
+    for col in ['Gold', 'Silver', 'Bronze']:
+        if col not in medal_tally.columns:
+            medal_tally[col] = 0
+
+    medal_tally = medal_tally[['Gold', 'Silver', 'Bronze']].sort_values("Gold", ascending=False).reset_index()
+    medal_tally['total'] = medal_tally['Gold'] + medal_tally['Silver'] + medal_tally['Bronze']
+
+    return medal_tally.astype({'Gold': 'int', 'Silver': 'int', 'Bronze': 'int', 'total': 'int'})
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(7)
+    rows = []
+    for year, season, city in GAMES:
+        # not every NOC at every Games, and an unmapped one (no region)
+        nocs = rng.choice(REGIONS['NOC'].tolist() + ['XXX'], size=5, replace=False)
+        for i in range(400):
+            noc = nocs[i % len(nocs)]
+            rows.append({
+                'ID': int(rng.integers(1, 300)), 'Name': f"Athlete {i}", 'Sex': 'MF'[i % 2], 'Age': 25,
+                'Height': 175.0, 'Weight': 70.0, 'Team': noc, 'NOC': noc, 'Games': f"{year} {season}",
+                'Year': year, 'Season': season, 'City': city, 'Sport': f"Sport {i % 4}", 'Event': f"Event {i % 12}",
+                # Kenya never medals in the Winter Games
+                'Medal': None if noc == 'KEN' and season == 'Winter' else
+                         rng.choice(np.array(['Gold', 'Silver', 'Bronze', None, None], dtype=object)),
+            })
+    return preprocessor.preprocess(pd.DataFrame(rows), REGIONS)
+
+
+def test_cube_matches_groupby_for_every_year_and_country(frame):
+    df = preprocessor.apply_schema(frame)
+    cube = preprocessor.build_medal_cube(df)
+    years, countries = helper.country_year_list(df)
+    assert len(years) > 1 and len(countries) > 1
+
+    for year in years:
+        for country in countries:
+            expected = groupby_medal_tally(frame, year, country)
+            result = helper.fetch_medal_tally(df, year, country, cube=cube)
+            pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False,
+                                          obj=f"medal tally for year={year}, country={country}")
+
+
+def test_fallback_matches_groupby(frame):
+    df = preprocessor.apply_schema(frame)
+    for year, country in [('Overall', 'Overall'), (1994, 'Overall'), ('Overall', 'Norway'), (2016, 'Kenya')]:
+        pd.testing.assert_frame_equal(helper.fetch_medal_tally(df, year, country),
+                                      groupby_medal_tally(frame, year, country),
+                                      check_dtype=False, check_categorical=False)
@@ -0,0 +1,91 @@
+import pandas as pd
+import pytest
+
+import name_search
+
+NAMES = pd.Series({
+    1: 'BOLT Usain',
+    2: 'Zoë Bolton',
+    3: 'Michael Phelps',
+    4: 'PHELPS Michael',  # second spelling of athlete 3's name under another ID
+    5: 'Mo Farah',
+    6: 'Bob Beamon',
+    7: 'Björn Dählie',
+    8: 'Boris Becker',
+})
+MEDALS = pd.Series({1: 8, 2: 0, 3: 28, 5: 4, 6: 1, 7: 12, 8: 0})
+APPEARANCES = pd.Series({1: 3, 2: 2, 3: 5, 4: 1, 5: 3, 6: 1, 7: 4, 8: 6})
+
+
+@pytest.fixture(scope='module')
+def index():
+    return name_search.NameIndex(NAMES, medals=MEDALS, appearances=APPEARANCES)
+
+
+def test_fold_ignores_accents_case_punctuation_and_token_order():
+    assert name_search.fold('Usain BOLT') == name_search.fold('bolt, usain') == 'bolt usain'
+    assert name_search.fold('Björn DÄHLIE') == 'bjorn dahlie'
+    assert name_search.fold('  ') == ''
+
+
+@pytest.mark.parametrize('query', ['usain bolt', 'BOLT Usain', 'Bolt,  USAIN'])
+def test_exact_match_in_any_order_and_case(index, query):
+    assert index.search(query, k=1) == [1]
+
+
+def test_accented_names_found_without_accents(index):
+    assert index.search('bjorn dahlie', k=1) == [7]
+    assert index.search('zoe', k=1) == [2]
+
+
+def test_prefix_range_matches_every_token(index):
+    # 'bo' starts a token of Bolt, Bolton, Bob and Boris
+    assert index.search('bo') == [1, 6, 8, 2]
+    assert index.search('bol usa') == [1]
+    assert index.search('mich phel') == [3, 4]
+
+
+def test_typo_falls_back_to_trigrams(index):
+    assert index.prefix(['phelsp']).size == 0
+    assert index.search('michael phelsp', k=2) == [3, 4]
+    assert index.search('usian bolt', k=1) == [1]
+
+
+def test_no_match(index):
+    assert index.search('xqzv') == []
+
+
+def test_exact_key_ranks_before_prefix_matches():
+    names = pd.Series({1: 'Ana Lee', 2: 'Ana Leeds'})
+    index = name_search.NameIndex(names, medals=pd.Series({1: 0, 2: 10}))
+    assert index.search('lee ana') == [1, 2]
+    assert index.search('ana le') == [2, 1]
+
+
+def test_prefix_matches_rank_by_medals_then_appearances_then_name(index):
+    # Dählie (12 medals), Bolt (8), Beamon (1), then Becker and Bolton (none): Becker appears more often
+    assert index.search('b') == [7, 1, 6, 8, 2]
+    ties = name_search.NameIndex(pd.Series({1: 'Anna Ek', 2: 'Anna Eck', 3: 'Anna Berg'}))
+    assert ties.search('anna') == [3, 2, 1]
+
+
+def test_empty_query_returns_most_popular(index):
+    assert index.search('') == index.search(None) == [3, 7, 1, 5, 6, 8, 2, 4]
+    assert index.search('', k=2) == [3, 7]
+
+
+@pytest.mark.parametrize('query, expected', [('m', [3, 5, 4]), ('mo', [5]), ('B', [7, 1, 6, 8, 2]), ('x', [])])
+def test_one_and_two_character_queries(index, query, expected):
+    assert index.search(query) == expected
+
+
+def test_build_name_index_from_frame():
+    df = pd.DataFrame({
+        'AthleteID': [1, 1, 2, 3],
+        'Name': ['Usain Bolt', 'Usain Bolt', 'Zoë Bolton', 'Mo Farah'],
+        'Medal': ['Gold', None, None, 'Gold'],
+    })
+    df['Name'] = df['Name'].astype('category')
+    index = name_search.build_name_index(df)
+    assert len(index) == 3
+    assert index.search('bolt') == [1, 2]
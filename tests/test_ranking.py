@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import helper
+import preprocessor
+
+REGIONS = pd.DataFrame({
+    'NOC': ['USA', 'GBR', 'NOR', 'IND', 'KEN'],
+    'region': ['USA', 'UK', 'Norway', 'India', 'Kenya'],
+    'notes': [None, None, None, None, None],
+})
+SPORTS = ['Athletics', 'Swimming', 'Rowing', 'Fencing']
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(11)
+    # few medals per athlete, so most of the top-N cut falls in ties
+    athletes = pd.DataFrame({
+        'AthleteID': np.arange(120),
+        'Name': [f"Athlete {i}" for i in range(120)],
+        'NOC': rng.choice(REGIONS['NOC'].tolist() + ['XXX'], size=120),
+        'Sport': rng.choice(SPORTS, size=120),
+    })
+    rows = athletes.iloc[rng.integers(0, len(athletes), size=900)].reset_index(drop=True)
+    # some athletes also compete in a second sport, so their first-seen Sport is not their only one
+    switched = rng.random(len(rows)) < 0.15
+    rows.loc[switched, 'Sport'] = rng.choice(SPORTS, size=int(switched.sum()))
+    rows['Medal'] = rng.choice(np.array(['Gold', 'Silver', 'Bronze', None, None, None], dtype=object), size=len(rows))
+    rows['Year'] = rng.choice([1996, 2000, 2004], size=len(rows))
+    rows['Season'] = 'Summer'
+    df = preprocessor.preprocess(rows, REGIONS).reset_index(drop=True)
+    return preprocessor.apply_schema(df)
+
+
+@pytest.fixture(scope='module')
+def ranking(frame):
+    return preprocessor.build_athlete_ranking(frame)
+
+
+def test_most_successful_matches_value_counts(frame, ranking):
+    for sport in ['Overall'] + SPORTS:
+        pd.testing.assert_frame_equal(helper.most_successful(frame, sport, ranking=ranking),
+                                      helper.most_successful(frame, sport), check_dtype=False, obj=sport)
+
+
+def test_most_successful_countrywise_matches_value_counts(frame, ranking):
+    for country in frame['region'].dropna().unique().tolist() + ['Atlantis']:
+        pd.testing.assert_frame_equal(helper.most_successful_countrywise(frame, country, ranking=ranking),
+                                      helper.most_successful_countrywise(frame, country),
+                                      check_dtype=False, obj=country)
+
+
+def test_ties_rank_by_first_medal_row(frame, ranking):
+    result = helper.most_successful(frame, 'Overall', ranking=ranking)
+    medals = frame.dropna(subset=['Medal']).reset_index(drop=True)
+    first_row = medals.groupby('AthleteID').apply(lambda rows: rows.index.min())
+    names = frame.drop_duplicates('AthleteID').set_index('AthleteID')['Name'].astype(str)
+    first_row.index = names.loc[first_row.index].to_numpy()
+    tied = result[result['Medals'].duplicated(keep=False)]
+    assert len(tied) > 1
+    for _, group in tied.groupby('Medals'):
+        assert first_row.loc[group['Name']].is_monotonic_increasing
+
+
+def test_top_athletes_are_plain_strings(frame, ranking):
+    result = helper.most_successful(frame, 'Swimming', ranking=ranking)
+    assert not any(isinstance(dtype, pd.CategoricalDtype) for dtype in result.dtypes)